@@ -1,8 +1,25 @@
 import os
+import socket
+import time
+import asyncio
+import functools
+import logging
+from contextlib import contextmanager
+import aiomysql
 import psycopg
+import pymysql
+import redis
+from dbutils.pooled_db import PooledDB
 from psycopg_pool import AsyncConnectionPool
 from core.config import Config
 
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=64)
+def in_placeholders(n: int) -> str:
+    """'%s,%s,...' with n placeholders for a parameterized MySQL IN (...) clause."""
+    return ','.join(['%s'] * n)
+
 class PostgresPool:
     """
     Singleton Async PostgreSQL Connection Pool.
@@ -23,11 +40,16 @@ class PostgresPool:
             # If running multiple workers, divide this number by the number of workers.
             cls._pool = AsyncConnectionPool(
                 conninfo=Config.CHECKPOINT_DB_URI,
-                max_size=80,  # Increased to support higher concurrency (Requires Postgres max_connections > 80)
+                min_size=Config.CHECKPOINT_POOL_MIN_SIZE,  # Kept warm so bursts don't pay connect + auth
+                max_size=Config.CHECKPOINT_POOL_MAX_SIZE,  # Requires Postgres max_connections > max_size x workers
+                max_idle=300,       # Shrink back toward min_size after 5 idle minutes
+                max_lifetime=3600,  # Recycle connections hourly
                 open=False,   # Don't open immediately to avoid event loop issues at import time
                 kwargs={
                     "autocommit": True,
-                    "prepare_threshold": 0,
+                    # Checkpoint queries repeat on every node transition; server-side prepare them
+                    # after N executions. Set CHECKPOINT_PREPARE_THRESHOLD=0 behind transaction-mode pgbouncer.
+                    "prepare_threshold": Config.CHECKPOINT_PREPARE_THRESHOLD,
                 }
             )
         return cls._pool
@@ -36,12 +58,171 @@ class PostgresPool:
     async def open_pool(cls):
         """Explicitly open the pool. Call this on app startup."""
         pool = cls.get_or_create_pool()
-        await pool.open()
-        print(f"PostgreSQL Connection Pool Opened (max_size={pool.max_size}).")
+        await pool.open(wait=True)  # Pre-warm min_size connections before serving traffic
+        logger.info("PostgreSQL Connection Pool Opened (min_size=%s, max_size=%s).", pool.min_size, pool.max_size)
 
     @classmethod
     async def close_pool(cls):
         """Close the pool. Call this on app shutdown."""
         if cls._pool:
             await cls._pool.close()
-            print("PostgreSQL Connection Pool Closed.")
+            logger.info("PostgreSQL Connection Pool Closed.")
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """Pool counters (pool_size, pool_available, requests_waiting, ...) for monitoring."""
+        return cls._pool.get_stats() if cls._pool else {}
+
+class MySQLPool:
+    """
+    Singleton PyMySQL connection pool (DBUtils PooledDB).
+
+    - Callers borrow a connection and return it on exit instead of paying a
+      TCP connect + auth handshake per use.
+    - ping=1 checks a connection when it is borrowed, so connections dropped by
+      wait_timeout are replaced transparently.
+    """
+    _pool: PooledDB = None
+
+    @classmethod
+    def get_or_create_pool(cls) -> PooledDB:
+        if cls._pool is None:
+            cls._pool = PooledDB(
+                creator=pymysql,
+                mincached=2,
+                maxcached=8,        # Idle connections kept for reuse
+                maxconnections=32,  # Sync tools borrow from server worker threads too
+                blocking=True,  # Wait for a free connection instead of raising
+                ping=1,
+                host=Config.DB_HOST,
+                port=Config.DB_PORT,
+                user=Config.DB_USER,
+                password=Config.DB_PASSWORD,
+                database=Config.DB_NAME,
+            )
+        return cls._pool
+
+    @classmethod
+    @contextmanager
+    def get_conn(cls):
+        """Borrow a pooled connection; it is returned to the pool (not closed) on exit."""
+        conn = cls.get_or_create_pool().connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+class AsyncMySQLPool:
+    """
+    Singleton aiomysql pool for MySQL access from coroutines (async tools/nodes),
+    so a DB call awaits instead of blocking the event loop for every request.
+    Created lazily on first use in the serving loop; close it on app shutdown.
+    The pool (and its lock) belong to the loop that created them: when called from
+    another loop (e.g. a script's second asyncio.run), a new pool is created for it
+    and the old one is closed on its own loop. Call close_pool() before a loop ends.
+    """
+    _pool: aiomysql.Pool = None
+    _lock: asyncio.Lock = None
+    _loop: asyncio.AbstractEventLoop = None
+
+    @classmethod
+    async def get_or_create_pool(cls) -> aiomysql.Pool:
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls._retire()
+            cls._lock, cls._loop = asyncio.Lock(), loop
+        if cls._pool is None:
+            async with cls._lock:
+                if cls._pool is None:
+                    cls._pool = await aiomysql.create_pool(
+                        host=Config.DB_HOST,
+                        port=Config.DB_PORT,
+                        user=Config.DB_USER,
+                        password=Config.DB_PASSWORD,
+                        db=Config.DB_NAME,
+                        minsize=5,
+                        maxsize=30,
+                        pool_recycle=3600,  # Stay under MySQL wait_timeout
+                        # Reads don't leave a transaction open (aiomysql drops connections
+                        # released mid-transaction); writers call conn.begin() explicitly.
+                        autocommit=True,
+                    )
+        return cls._pool
+
+    @staticmethod
+    async def _close(pool: aiomysql.Pool):
+        pool.close()
+        await pool.wait_closed()
+
+    @classmethod
+    def _retire(cls):
+        """Close the current pool on the loop that owns it, and forget it."""
+        pool, loop = cls._pool, cls._loop
+        cls._pool, cls._lock, cls._loop = None, None, None
+        if pool is None:
+            return
+        if loop.is_closed():
+            # Its transports can't be closed anymore; sockets go with the connections
+            logger.warning("MySQL Async Connection Pool abandoned: its event loop closed before close_pool().")
+        else:
+            asyncio.run_coroutine_threadsafe(cls._close(pool), loop)
+
+    @classmethod
+    async def close_pool(cls):
+        """Close the pool. Call this on app shutdown (or before the loop using it ends)."""
+        if cls._pool and cls._loop is asyncio.get_running_loop():
+            pool = cls._pool
+            cls._pool, cls._lock, cls._loop = None, None, None
+            await cls._close(pool)
+            logger.info("MySQL Async Connection Pool Closed.")
+        else:
+            cls._retire()
+
+class RedisPool:
+    """
+    Singleton Redis client backed by a BlockingConnectionPool.
+
+    - Concurrent graph invocations borrow sockets from the pool instead of
+      serializing on one connection or reconnecting on traffic spikes.
+    - The server is pinged on first use; while it is unreachable, get_client()
+      returns None and callers skip their Redis-backed fast path. The ping is
+      retried at most every RETRY_SECONDS, so a blip at startup is not permanent.
+    """
+    RETRY_SECONDS = 30
+    _pool: redis.BlockingConnectionPool = None
+    _client: redis.Redis = None
+    _retry_at: float = 0.0
+
+    @classmethod
+    def get_or_create_pool(cls) -> redis.BlockingConnectionPool:
+        if cls._pool is None:
+            keepalive_options = {}
+            if hasattr(socket, "TCP_KEEPIDLE"):  # Linux only
+                keepalive_options[socket.TCP_KEEPIDLE] = 60
+            cls._pool = redis.BlockingConnectionPool(
+                host=Config.REDIS_HOST,
+                port=Config.REDIS_PORT,
+                db=Config.REDIS_DB,
+                max_connections=64,
+                timeout=2,  # Seconds to wait for a free connection
+                socket_keepalive=True,
+                socket_keepalive_options=keepalive_options,
+                health_check_interval=30,
+            )
+        return cls._pool
+
+    @classmethod
+    def get_client(cls):
+        """Return the shared Redis client, or None if Redis is unavailable."""
+        if cls._client is None and time.monotonic() >= cls._retry_at:
+            client = redis.Redis(connection_pool=cls.get_or_create_pool())
+            try:
+                client.ping()
+                cls._client = client
+            except redis.RedisError as e:
+                cls._retry_at = time.monotonic() + cls.RETRY_SECONDS
+                logger.warning(
+                    "Redis unavailable (%s:%s), retrying in %ss: %s",
+                    Config.REDIS_HOST, Config.REDIS_PORT, cls.RETRY_SECONDS, e
+                )
+        return cls._client
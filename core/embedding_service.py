@@ -1,9 +1,12 @@
 import os
 import logging
 import json
+import functools
+import hashlib
 from typing import List, Optional, Any
 from langchain_community.embeddings.dashscope import DashScopeEmbeddings, embed_with_retry
 from django.conf import settings
+from core.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,11 @@ COLLECTION_RAW_DOCS = 'project_raw_docs'
 DEFAULT_EMBEDDING_MODEL = "text-embedding-v4"
 DEFAULT_EMBEDDING_DIM = 1536
 
+def _embedding_cache_key(text: str) -> str:
+    # sha1, not hash(): str hashes are salted per process, so those keys never hit
+    # across workers or restarts in a shared (Redis) cache
+    return f"embedding:v4:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
 # Custom Embeddings Wrapper to support dimension parameter
 class CustomDashScopeEmbeddings(DashScopeEmbeddings):
     dimension: Optional[int] = None
@@ -121,7 +129,7 @@ class EmbeddingService:
                 uncached_indices = []
                 
                 for i, text in enumerate(texts):
-                    cache_key = f"embedding:v4:{hash(text)}"
+                    cache_key = _embedding_cache_key(text)
                     cached_val = cache.get(cache_key)
                     if cached_val:
                         # Validate dimension to prevent 1024 vs 1536 mismatch from old cache
@@ -145,7 +153,7 @@ class EmbeddingService:
                 
                 for i, text in enumerate(uncached_texts):
                     if i < len(new_embeddings):
-                        cache_key = f"embedding:v4:{hash(text)}"
+                        cache_key = _embedding_cache_key(text)
                         cache.set(cache_key, new_embeddings[i], timeout=3600)
                 
                 result = [None] * len(texts)
@@ -253,7 +261,7 @@ class EmbeddingService:
                 uncached_indices = []
                 
                 for i, text in enumerate(texts):
-                    cache_key = f"embedding:v4:{hash(text)}"
+                    cache_key = _embedding_cache_key(text)
                     # Sync cache access
                     cached_val = cache.get(cache_key)
                     if cached_val:
@@ -276,7 +284,7 @@ class EmbeddingService:
                 
                 for i, text in enumerate(uncached_texts):
                     if i < len(new_embeddings):
-                        cache_key = f"embedding:v4:{hash(text)}"
+                        cache_key = _embedding_cache_key(text)
                         cache.set(cache_key, new_embeddings[i], timeout=3600)
                 
                 result = [None] * len(texts)
@@ -364,7 +372,13 @@ def ensure_milvus_connection():
     except Exception as e:
         logger.error(f"Failed to connect to Milvus: {e}")
 
+@functools.cache
 def get_or_create_collection(collection_name: str, dim: int = 1536) -> Collection:
+    """
+    Return a loaded handle for the collection, creating it if needed.
+    Cached per process so the connect/has_collection/schema handshake runs once;
+    call get_or_create_collection.cache_clear() after dropping a collection.
+    """
     ensure_milvus_connection()
     
     if utility.has_collection(collection_name):
@@ -392,12 +406,10 @@ def get_or_create_collection(collection_name: str, dim: int = 1536) -> Collectio
     schema = CollectionSchema(fields, f"{collection_name} schema")
     collection = Collection(collection_name, schema)
     
-    # Create Index
-    index_params = {
-        "metric_type": "COSINE",
-        "index_type": "IVF_FLAT",
-        "params": {"nlist": 128}
-    }
+    # Vector index (and its search params) is defined once in Config.MILVUS_VECTOR_INDEXES
+    index_params = Config.MILVUS_VECTOR_INDEXES[collection_name]
     collection.create_index(field_name="vector", index_params=index_params)
+    # Scalar index so "project_id in [...]" filters are resolved by index, not a scan
+    collection.create_index(field_name="project_id", index_name="project_id_idx", index_params={"index_type": "STL_SORT"})
     collection.load()
     return collection
@@ -0,0 +1,96 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-process semantic cache keyed by query embedding.
+
+    A lookup hits when the cosine similarity between the query embedding and a
+    stored embedding is >= threshold, so paraphrased inputs reuse earlier results.
+
+    - Embeddings are L2-normalized into a preallocated (max_size, dim) matrix,
+      so a lookup is one matrix-vector product (cosine == dot product).
+    - LRU eviction once max_size is reached; entries also expire after their TTL.
+    - Thread-safe (RLock), so one instance can be shared across requests.
+    - Values are deep-copied on put and on every hit: callers put results into graph
+      state, where later nodes may mutate them.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()  # slot -> value, in LRU order
+        self._matrix: Optional[np.ndarray] = None  # Allocated on first put (dim unknown until then)
+        self._expires = np.full(max_size, -np.inf)
+        self._free = list(range(max_size))
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if vec.ndim != 1 or not norm:
+            return None  # Zero vectors are the embedding services' failure placeholder
+        return vec / norm
+
+    def check(self, embedding: Sequence[float], threshold: float) -> Optional[Any]:
+        """Return the value of the most similar live entry if similarity >= threshold, else None."""
+        vec = self._normalize(embedding)
+        if vec is None:
+            return None
+        with self._lock:
+            if not self._entries or self._matrix.shape[1] != vec.shape[0]:
+                return None
+            slots = np.fromiter(self._entries, dtype=np.intp, count=len(self._entries))
+            # Product over the whole matrix, then pick the occupied rows: indexing the
+            # matrix first would copy those rows on every lookup
+            sims = (self._matrix @ vec)[slots]
+            sims[self._expires[slots] <= time.monotonic()] = -np.inf
+            best = int(np.argmax(sims))
+            if sims[best] < threshold:
+                return None
+            slot = int(slots[best])
+            self._entries.move_to_end(slot)
+            return copy.deepcopy(self._entries[slot])
+
+    def put(self, embedding: Sequence[float], value: Any, ttl: Optional[float] = None):
+        """Store value under embedding; if full, drop expired entries, then the least recently used one."""
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vec.shape[0]:
+                # First put (or embedding model changed): (re)allocate and start empty
+                self._matrix = np.zeros((self.max_size, vec.shape[0]), dtype=np.float32)
+                self.clear()
+            if not self._free:
+                self._drop_expired()
+            if not self._free:
+                evicted, _ = self._entries.popitem(last=False)
+                self._free.append(evicted)
+            slot = self._free.pop()
+            self._matrix[slot] = vec
+            self._expires[slot] = time.monotonic() + (ttl if ttl is not None else self.ttl_seconds)
+            self._entries[slot] = copy.deepcopy(value)
+
+    def _drop_expired(self):
+        """Free every expired slot, so LRU eviction only ever pushes out live entries."""
+        slots = np.fromiter(self._entries, dtype=np.intp, count=len(self._entries))
+        for slot in slots[self._expires[slots] <= time.monotonic()].tolist():
+            del self._entries[slot]
+            self._free.append(slot)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expires.fill(-np.inf)
+            self._free = list(range(self.max_size))
+
+    def __len__(self):
+        return len(self._entries)
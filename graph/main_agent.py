@@ -17,7 +17,7 @@ from core.django_setup import setup_django
 setup_django()
 
 from typing_extensions import TypedDict, Annotated, List, Literal, Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage, SystemMessage, trim_messages
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.prompts import ChatPromptTemplate
@@ -35,6 +35,10 @@ from tools.new_search_tools import retrieve_project_chunks, retrieve_project_sum
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from core.db import PostgresPool
 
+# Prompt history caps: LLM latency and checkpoint size grow with the conversation
+CHAT_HISTORY_MAX_MESSAGES = 12
+QA_HISTORY_MAX_CHARS = 600
+
 def get_last_message_text(messages: List[BaseMessage]) -> str:
     """Helper to extract text from the last message, handling list-based content."""
     if not messages:
@@ -262,7 +266,15 @@ from langchain_core.runnables import RunnableConfig
 async def chat_node(state: MasterState, config: RunnableConfig):
     """General Chat Node."""
     llm = Config.get_utility_llm()
-    messages = state["messages"]
+    # Keep only the most recent turns (each message counts as one "token")
+    messages = trim_messages(
+        state["messages"],
+        max_tokens=CHAT_HISTORY_MAX_MESSAGES,
+        token_counter=len,
+        strategy="last",
+        start_on="human",
+        include_system=True,
+    )
     sanitized_messages = [_coerce_to_base_message(m) for m in messages]
     user_profile = state.get("user_profile", {})
     
@@ -346,7 +358,8 @@ async def project_qa_node(state: MasterState, config: RunnableConfig):
              content = " ".join([b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"])
         chat_history.append(f"{role}: {content}")
     
-    history_str = "\n".join(chat_history)
+    # Keep the tail: the most recent exchange matters most for resolving references
+    history_str = "\n".join(chat_history)[-QA_HISTORY_MAX_CHARS:]
     
     # Generate standalone question for better retrieval
     standalone_question = last_question
@@ -33,11 +33,15 @@ class PublisherState(TypedDict):
     is_local_upload: bool # Whether user chose local upload
     cover_image_path: Optional[str] # Path to user uploaded cover image (passed from router)
     
+    # Save Result (lifted from the save_requirement artifact by tools_node)
+    saved_requirement_id: int
+    saved_requirement_data: Dict[str, Any] # id/title/brief/description/tags/status for vector sync
+    
     # Flags
     next_step: str
     is_complete: bool
 
-@tool
+@tool(response_format="content_and_artifact")
 def save_requirement(
     user_id: int, 
     org_id: int, 
@@ -74,6 +78,10 @@ def save_requirement(
         tag2_ids: List of Skill Tag IDs.
         draft_id: Existing draft ID to update (0 for new).
         cover_image_url: The URL or path of the selected cover image (optional).
+    
+    Returns:
+        A (message, artifact) pair. The artifact carries the saved requirement
+        data (including tag names) so callers don't need to re-query it.
     """
     try:
         # Check user and org
@@ -82,7 +90,7 @@ def save_requirement(
             # Use user object directly as per best practice and to avoid confusion
             org_user = OrganizationUser.objects.get(user=user, organization_id=org_id)
         except OrganizationUser.DoesNotExist:
-            return f"Error: User {user_id} is not a member of Organization {org_id}. Please verify the user belongs to this organization."
+            return f"Error: User {user_id} is not a member of Organization {org_id}. Please verify the user belongs to this organization.", None
         
         if draft_id and draft_id > 0:
             try:
@@ -238,11 +246,20 @@ def save_requirement(
             except Exception as e:
                 print(f"Error in manual vector sync: {e}")
 
+        saved_data = {
+            "id": req.id,
+            "title": req.title,
+            "brief": req.brief,
+            "description": req.description,
+            "tags": list(req.tag1.values_list("value", flat=True)) + list(req.tag2.values_list("post", flat=True)),
+            "status": req.status
+        }
+
         action = "Published" if status == 'under_review' else "Draft Saved"
-        return f"{action} successfully. ID: {req.id}"
+        return f"{action} successfully. ID: {req.id}", saved_data
         
     except Exception as e:
-        return f"Error saving requirement: {str(e)}"
+        return f"Error saving requirement: {str(e)}", None
 
 @tool
 def recommend_tags():
@@ -533,7 +550,21 @@ workflow.add_node("cover_flow", cover_flow_node) # Add cover flow node
 
 from langgraph.prebuilt import ToolNode
 tool_node = ToolNode([save_requirement])
-workflow.add_node("tools", tool_node)
+
+async def tools_node(state: PublisherState, config: RunnableConfig):
+    """
+    Execute save_requirement and lift its artifact into state,
+    so the parent graph reads the saved ID directly instead of parsing ToolMessages.
+    """
+    result = await tool_node.ainvoke(state, config)
+    update = {"messages": result["messages"]}
+    for m in result["messages"]:
+        if m.name == "save_requirement" and m.artifact:
+            update["saved_requirement_id"] = m.artifact["id"]
+            update["saved_requirement_data"] = m.artifact
+    return update
+
+workflow.add_node("tools", tools_node)
 
 workflow.set_entry_point("chat")
 
@@ -1,5 +1,6 @@
 import json
 import sys
+import asyncio
 import os
 import django
 import base64
@@ -8,6 +9,9 @@ import uuid
 
 import re
 import traceback
+import hashlib
+import orjson
+import numpy as np
 
 # Add parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -20,7 +24,7 @@ from core.django_setup import setup_django
 setup_django()
 
 from typing_extensions import TypedDict, Annotated, List, Literal, Optional, Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage, ToolMessage, SystemMessage, trim_messages
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.prompts import ChatPromptTemplate
@@ -32,6 +36,7 @@ from core.embedding_service import generate_embedding, get_or_create_collection,
 from project.services import delete_requirement_vectors, sync_raw_docs_from_text
 from project.models import Requirement
 from project.signals import handle_requirement_save, handle_files_change, handle_tags_change
+from django.db import transaction
 from django.db.models.signals import post_save, m2m_changed
 from contextlib import contextmanager
 
@@ -55,7 +60,7 @@ def suppress_signals():
 
 # Import Postgres Saver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from core.db import PostgresPool
+from core.db import PostgresPool, RedisPool
 
 # --- 1. Define State ---
 
@@ -87,6 +92,31 @@ class PublisherMasterState(TypedDict):
 
 # --- 2. Define Nodes ---
 
+# Keyword pre-filter for router_node.
+# Publisher intent is highly keyword-predictable, so we answer the obvious cases
+# without an LLM round-trip and only fall through to the classifier otherwise.
+# ASCII triggers are matched as whole tokens; CJK text has no word boundaries,
+# so CJK triggers are matched as substrings.
+_PUB_TRIGGERS = frozenset({'publish', 'post', 'draft'})
+_PUB_TRIGGERS_CJK = ('发布', '新建需求', '创建需求', '我要发', '需求发布', '招募')
+_CHAT_TRIGGERS = frozenset({'hi', 'hello', 'help'})
+_CHAT_TRIGGERS_CJK = ('你好', '嗨', '帮助', '谢谢')
+_WORD_RE = re.compile(r'\w+')
+
+# Upload filename discovery (see router_node)
+_FILENAME_KEYS = ('name', 'filename', 'fileName', 'file_name', 'title', 'label', 'path')
+_DOC_EXT_RE = re.compile(r'\.(pdf|docx?)$', re.IGNORECASE)
+
+def _route_by_keywords(last_msg: str) -> Optional[str]:
+    """Return the next step if the message matches a trigger keyword, else None."""
+    lowered = last_msg.lower()
+    tokens = set(_WORD_RE.findall(lowered))
+    if tokens & _PUB_TRIGGERS or any(t in lowered for t in _PUB_TRIGGERS_CJK):
+        return "publisher_flow"
+    if len(last_msg) < 20 and (tokens & _CHAT_TRIGGERS or any(t in lowered for t in _CHAT_TRIGGERS_CJK)):
+        return "chat_node"
+    return None
+
 def cleanup_stale_files():
     """
     Clean up stale files in the tmp directory that are older than 1 hour.
@@ -179,35 +209,21 @@ async def router_node(state: PublisherMasterState):
                             file_path = temp_path
                             # Try to get filename from various keys, fallback to uuid
                             # UPDATE: Based on user logs, 'metadata' key exists. Let's check inside it.
-                            metadata = item.get('metadata', {})
+                            metadata = item.get('metadata') or {}
                             
-                            original_filename = (
-                                item.get('name') or 
-                                item.get('filename') or 
-                                item.get('fileName') or 
-                                item.get('file_name') or
-                                item.get('title') or
-                                item.get('label') or
-                                item.get('path') or
-                                # Check metadata
-                                metadata.get('name') or
-                                metadata.get('filename') or
-                                metadata.get('fileName') or
-                                metadata.get('title')
+                            # Item keys take precedence over metadata keys
+                            original_filename = next(
+                                (v for source in (item, metadata) for k in _FILENAME_KEYS if (v := source.get(k))),
+                                None
                             )
                             
-                            # Heuristic: If still no valid name, search all values for a string ending in .pdf/.doc/.docx
-                            if not original_filename:
-                                for k, v in item.items():
-                                    if k != 'data' and k != 'content' and isinstance(v, str) and (v.lower().endswith('.pdf') or v.lower().endswith('.doc') or v.lower().endswith('.docx')):
-                                        original_filename = os.path.basename(v)
-                                        break
-                                        
-                            # Extreme Fallback: Check if the 'text' field contains a filename-like string
+                            # Heuristic: If still no valid name, search all values (including 'text') for a document filename
                             if not original_filename:
-                                 text_val = item.get('text', '')
-                                 if text_val and (text_val.lower().endswith('.pdf') or text_val.lower().endswith('.doc') or text_val.lower().endswith('.docx')):
-                                      original_filename = os.path.basename(text_val)
+                                original_filename = next(
+                                    (os.path.basename(v) for k, v in item.items()
+                                     if k not in ('data', 'content') and isinstance(v, str) and _DOC_EXT_RE.search(v)),
+                                    None
+                                )
 
                             if not original_filename:
                                  original_filename = f"upload_{uuid.uuid4()}{ext}"
@@ -321,13 +337,14 @@ async def router_node(state: PublisherMasterState):
         return {"next_step": "publisher_flow"}
     
     # Priority 3: Publisher Flow (Explicit Intent or Continuing)
+    # Fast path: obvious publish/greeting keywords skip the LLM classifier.
+    keyword_step = _route_by_keywords(last_msg)
+    if keyword_step:
+        return {"next_step": keyword_step}
+
     llm = Config.get_utility_llm()
     prompt = PUBLISHER_ROUTER_PROMPT
     try:
-        if len(messages) < 2 and len(last_msg) < 10: # Simple heuristic for short greetings
-             # Let's use LLM to be safe
-             pass
-             
         response = llm.invoke(prompt.format(message=last_msg))
         intent = response.content.strip().upper()
         
@@ -338,12 +355,22 @@ async def router_node(state: PublisherMasterState):
     except:
         return {"next_step": "chat_node"}
 
+# Prompt history cap for chat_node (each message counts as one "token")
+CHAT_HISTORY_MAX_MESSAGES = 12
+
 def chat_node(state: PublisherMasterState):
     """
     Simple Chat / Greeting Node.
     """
     llm = Config.get_utility_llm()
-    messages = state["messages"]
+    messages = trim_messages(
+        state["messages"],
+        max_tokens=CHAT_HISTORY_MAX_MESSAGES,
+        token_counter=len,
+        strategy="last",
+        start_on="human",
+        include_system=True,
+    )
     
     # Sanitize messages to ensure content is string for ChatTongyi (doesn't support list/multimodal content)
     sanitized_messages = []
@@ -389,9 +416,68 @@ def chat_node(state: PublisherMasterState):
     
     return {"messages": [response]}
 
+# Parsed-file cache: content hash -> file_parsing_app result
+# Re-uploading the same document (common while iterating on a draft) skips re-parsing.
+_PARSE_CACHE_TTL = 86400 * 7 # 7 days
+_HASH_BLOCK_SIZE = 4 * 1024 * 1024 # Hash large files incrementally in 4 MiB blocks
+
+def _file_digest(file_path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _store_parse_result(client, key: str, result: dict):
+    """
+    Store the parse result in Redis: metadata as JSON (orjson), and chunk_embeddings,
+    which dominate the payload, as one raw float32 buffer under '<key>:emb'.
+    Nothing is unpickled on load, so cache contents can't execute code.
+    Milvus stores FLOAT_VECTOR as float32, so no precision is lost.
+    """
+    payload = dict(result)
+    embeddings = None
+    if payload.get("chunk_embeddings") is not None:
+        try:
+            embeddings = np.asarray(payload["chunk_embeddings"], dtype=np.float32)
+        except ValueError:
+            pass # Ragged embeddings: keep the lists in the JSON
+    if embeddings is not None and embeddings.ndim == 2:
+        del payload["chunk_embeddings"]
+        payload["_embeddings_shape"] = embeddings.shape
+    else:
+        embeddings = None
+    
+    pipe = client.pipeline() # MULTI/EXEC: metadata and buffer land together
+    pipe.set(key, orjson.dumps(payload), ex=_PARSE_CACHE_TTL)
+    if embeddings is not None:
+        pipe.set(f"{key}:emb", embeddings.tobytes(), ex=_PARSE_CACHE_TTL)
+    else:
+        pipe.delete(f"{key}:emb")
+    pipe.execute()
+
+def _load_parse_result(client, key: str) -> Optional[dict]:
+    """Inverse of _store_parse_result. Returns None on a cache miss."""
+    pipe = client.pipeline()
+    pipe.get(key)
+    pipe.get(f"{key}:emb")
+    blob, buffer = pipe.execute()
+    if not blob:
+        return None
+    payload = orjson.loads(blob)
+    shape = payload.pop("_embeddings_shape", None)
+    if shape is not None:
+        if buffer is None:
+            return None # Buffer expired or evicted separately: treat as a miss
+        payload["chunk_embeddings"] = np.frombuffer(buffer, dtype=np.float32).reshape(shape).tolist()
+    return payload
+
 async def file_parsing_node(state: PublisherMasterState):
     """
     Handle file parsing.
+    Results are cached in Redis by file content hash.
+    Hashing and the (sync) Redis calls run in worker threads: a large upload's hash
+    or serialized buffers would otherwise block the event loop for every request.
     """
     file_path = state["file_path"]
     original_filename = state.get("original_filename") or os.path.basename(file_path)
@@ -401,7 +487,27 @@ async def file_parsing_node(state: PublisherMasterState):
         "file_name": original_filename,
     }
     
-    result = await file_parsing_app.ainvoke(input_state)
+    redis_client = await asyncio.to_thread(RedisPool.get_client)  # First call pings
+    cache_key = None
+    result = None
+    if redis_client is not None:
+        try:
+            cache_key = f"parse:v2:{await asyncio.to_thread(_file_digest, file_path)}"  # v2: JSON + raw buffer
+            cached = await asyncio.to_thread(_load_parse_result, redis_client, cache_key)
+            if cached:
+                # Path/name belong to this upload, not the one that populated the cache
+                result = {**cached, **input_state}
+                print(f"Parse cache hit for {original_filename} ({cache_key})")
+        except Exception as e:
+            print(f"Parse cache lookup failed: {e}")
+    
+    if result is None:
+        result = await file_parsing_app.ainvoke(input_state)
+        if cache_key and result.get("success"):
+            try:
+                await asyncio.to_thread(_store_parse_result, redis_client, cache_key, result)
+            except Exception as e:
+                print(f"Parse cache store failed: {e}")
     
     if result.get("success"):
         return {
@@ -439,7 +545,9 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
         "selected_tags": {},
         "next_step": "",
         "is_complete": False,
-        "cover_image_path": state.get("cover_image_path") # Pass cover image path
+        "cover_image_path": state.get("cover_image_path"), # Pass cover image path
+        "saved_requirement_id": 0, # Reset per turn; set by publisher_agent's tools node
+        "saved_requirement_data": {}
     }
     
     # Inject Parsed Data if available and first run (no draft data yet)
@@ -476,46 +584,14 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
     last_msg = final_messages[-1]
     
     # Detect if Requirement was Saved/Published
-    new_req_id = 0
-    final_req_data = {}
-    
-    # Scan for Tool Message from 'save_requirement'
-    # We look at the last few messages
-    for m in reversed(final_messages):
-        if isinstance(m, ToolMessage) and m.name == "save_requirement":
-            # Robust ID extraction using regex
-            # Matches "ID: 123" or "ID:123" or "ID: 123."
-            match = re.search(r"ID:\s*(\d+)", m.content)
-            if match:
-                try:
-                    new_req_id = int(match.group(1))
-                    # Retrieve the actual requirement to get full data for vector sync
-                    try:
-                        # Wrap sync DB call
-                        @sync_to_async
-                        def get_req_details(req_id):
-                            req = Requirement.objects.get(id=req_id)
-                            tags1 = [t.value for t in req.tag1.all()]
-                            tags2 = [t.post for t in req.tag2.all()]
-                            return {
-                                "id": req.id,
-                                "title": req.title,
-                                "description": req.description,
-                                "tags": tags1 + tags2,
-                                "status": req.status
-                            }
-                        
-                        final_req_data = await get_req_details(new_req_id)
-                    except Exception as e:
-                        print(f"Error retrieving requirement details: {e}")
-                except Exception as e:
-                    print(f"Error parsing requirement ID: {e}")
-            break
+    # publisher_agent lifts the save_requirement result (incl. tags) into its state
+    new_req_id = result.get("saved_requirement_id") or 0
+    final_req_data = result.get("saved_requirement_data") or {}
             
     # === Handle File Attachment and Cleanup ===
     import shutil
     from project.models import File
-    from project.services import delete_requirement_vectors, get_or_create_collection, COLLECTION_RAW_DOCS, COLLECTION_EMBEDDINGS, generate_embedding
+    # Collection helpers come from core.embedding_service (module top) so the cached handles are reused
     
     file_path = state.get("file_path")
     original_name = state.get("original_filename", "document.pdf")
@@ -558,7 +634,8 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
             @sync_to_async
             def create_and_link_file(req_id, name, url, path, real_path, size):
                 # Suppress signals here too
-                with suppress_signals():
+                # One transaction: a single commit, and the link never points at an uncommitted File row
+                with suppress_signals(), transaction.atomic():
                     file_obj = File.objects.create(
                         name=name,
                         url=url,
@@ -567,7 +644,7 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
                         is_folder=False,
                         size=size
                     )
-                    req = Requirement.objects.get(id=req_id)
+                    req = Requirement.objects.select_for_update().get(id=req_id)
                     req.files.add(file_obj)
                     return file_obj
 
@@ -622,7 +699,7 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
                         desc = final_req_data.get("description", "")
                         tags = final_req_data.get("tags", [])
                         # Brief might be missing in final_req_data dict, retrieve from draft_data or empty
-                        brief = publisher_state.get("draft_data", {}).get("brief", "")
+                        brief = final_req_data.get("brief") or publisher_state.get("draft_data", {}).get("brief", "")
                         
                         full_text = f"Title: {title}\nBrief: {brief}\nDescription: {desc}\nTags: {', '.join(tags)}"
                         
@@ -647,6 +724,7 @@ async def publisher_bridge_node(state: PublisherMasterState, config: RunnableCon
                              try:
                                  from pymilvus import utility
                                  utility.drop_collection(COLLECTION_EMBEDDINGS)
+                                 get_or_create_collection.cache_clear() # Drop the stale handle
                                  print(f"Dropped {COLLECTION_EMBEDDINGS}, retrying insert...")
                                  collection_emb = get_or_create_collection(COLLECTION_EMBEDDINGS)
                                  collection_emb.insert(data_emb)
@@ -10,23 +10,22 @@ from core.config import Config
 from core.prompts import PROJECT_QA_PROMPT
 from tools.new_search_tools import retrieve_project_chunks, retrieve_project_summary
 
-# --- Helper Function (Duplicated from main_agent.py to ensure isolation) ---
+# Prompt history cap: the history is sent to both the condense and the answer prompts
+QA_HISTORY_MAX_CHARS = 600
+
+# --- Helper Functions (Duplicated from main_agent.py to ensure isolation) ---
+def _msg_text(message: BaseMessage) -> str:
+    """Extract text from a message, handling list-based content (e.g. from multimodal models)."""
+    content = message.content
+    if isinstance(content, list):
+        return " ".join(b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text")
+    return content if isinstance(content, str) else str(content)
+
 def get_last_message_text(messages: List[BaseMessage]) -> str:
     """Helper to extract text from the last message, handling list-based content."""
     if not messages:
         return ""
-    last_msg = messages[-1]
-    content = last_msg.content
-    if isinstance(content, str):
-        return content
-    if isinstance(content, list):
-        # Handle list of content blocks (e.g. from multimodal models)
-        text_parts = []
-        for block in content:
-            if isinstance(block, dict) and block.get("type") == "text":
-                text_parts.append(block.get("text", ""))
-        return " ".join(text_parts)
-    return str(content)
+    return _msg_text(messages[-1])
 
 # --- 1. Define State ---
 class QAState(TypedDict):
@@ -54,18 +53,12 @@ async def qa_node(state: QAState, config: RunnableConfig):
         return {"messages": [AIMessage(content="错误：未提供目标项目ID。")]}
 
     # --- 1. Contextualize Question (History Management) ---
-    chat_history = []
     # Take last 6 messages, excluding the very last one (current question)
-    history_msgs = messages[:-1][-6:] 
-    for msg in history_msgs:
-        role = "User" if isinstance(msg, HumanMessage) else "Assistant"
-        # Handle content extraction safely
-        content = msg.content
-        if isinstance(content, list):
-             content = " ".join([b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"])
-        chat_history.append(f"{role}: {content}")
-    
-    history_str = "\n".join(chat_history)
+    # Keep the tail: the most recent exchange matters most for resolving references
+    history_str = "\n".join(
+        f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {_msg_text(m)}"
+        for m in messages[-7:-1]
+    )[-QA_HISTORY_MAX_CHARS:]
     
     # Generate standalone question for better retrieval
     standalone_question = last_question
@@ -1,6 +1,10 @@
 
 import json
 import re
+import functools
+import numpy as np
+import orjson
+from datasketch import MinHash, MinHashLSH
 from typing_extensions import TypedDict, Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
@@ -13,8 +17,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.config import Config
 from core.prompts import REASONING_GEN_SYSTEM_PROMPT, REASONING_GEN_HUMAN_PROMPT
-from tools.search_tools import extract_keywords, retrieve_tags
-from tools.new_search_tools import search_projects_by_tags, search_projects_semantic, search_projects_fulltext
+from tools.search_tools import (
+    extract_keywords, retrieve_tags, embed_for_cache,
+    KEYWORDS_CACHE, KEYWORDS_CACHE_THRESHOLD, TAGS_CACHE_THRESHOLD
+)
+from tools.new_search_tools import search_projects_all
+from core.semantic_cache import SemanticCache
+
+# Tag retrieval results for analyze_query_node, keyed by user-input embedding
+TAGS_CACHE = SemanticCache(max_size=1024, ttl_seconds=300)
+
+# Fenced ```json {...}``` block in the reasoning output (compiled once, used on every request)
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL | re.IGNORECASE)
 
 # --- 1. Define State ---
 class AgentState(TypedDict):
@@ -59,18 +73,23 @@ async def analyze_query_node(state: AgentState):
     elif not isinstance(user_input, str):
         user_input = str(user_input)
         
+    query_emb = await embed_for_cache(user_input)
+
     # 1. Extract Keywords (LLM)
-    keywords = await extract_keywords.ainvoke(user_input)
+    keywords = KEYWORDS_CACHE.check(query_emb, KEYWORDS_CACHE_THRESHOLD) if query_emb else None
+    if keywords is None:
+        keywords = await extract_keywords.ainvoke(user_input)
+        if query_emb and keywords and keywords != [user_input]:  # Skip the error fallback
+            KEYWORDS_CACHE.put(query_emb, keywords)
     
     # 2. Extract Tags (Vector Search in Tag KB)
     # We construct queries from user input + extracted keywords
-    queries = [user_input]
-    if isinstance(keywords, list):
-        queries.extend(keywords)
-    elif isinstance(keywords, str):
-        queries.append(keywords)
-        
-    tag_result = await retrieve_tags.ainvoke({"queries": queries})
+    tag_result = TAGS_CACHE.check(query_emb, TAGS_CACHE_THRESHOLD) if query_emb else None
+    if tag_result is None:
+        queries = [user_input] + keywords  # retrieve_tags drops repeats
+        tag_result = await retrieve_tags.ainvoke({"queries": queries})
+        if query_emb and (tag_result['interest_ids'] or tag_result['skill_ids']):
+            TAGS_CACHE.put(query_emb, tag_result)
     
     return {
         "user_input": user_input,
@@ -81,107 +100,139 @@ async def analyze_query_node(state: AgentState):
         "skill_tags": tag_result.get('skill_tags', [])
     }
 
-async def track_tag_recall(state: AgentState):
-    """Track 1: Tag-based (Precise)"""
-    interest_ids = state.get('interest_ids', [])
-    skill_ids = state.get('skill_ids', [])
-    
-    results = await search_projects_by_tags.ainvoke({
-        "interest_ids": interest_ids, 
-        "skill_ids": skill_ids
-    })
-    for p in results: p["source"] = "tag"
-    return {"tag_candidates": results}
+def _tag_source(results: List[Dict], source: str) -> List[Dict]:
+    """Label recall results with their track."""
+    return [{**p, "source": source} for p in results]
 
-async def track_semantic_recall(state: AgentState):
-    """Track 2: Semantic (Fuzzy)"""
-    user_input = state['user_input']
-    results = await search_projects_semantic.ainvoke({
-        "query": user_input, 
-        "k": 5
+async def parallel_recall_node(state: AgentState):
+    """
+    Step 2: Multi-track recall, run concurrently (see search_projects_all).
+    Track 1: Tag-based (Precise), Track 2: Semantic (Fuzzy), Track 3: Keyword (Literal).
+    """
+    recall = await search_projects_all.ainvoke({
+        "interest_ids": state.get('interest_ids', []),
+        "skill_ids": state.get('skill_ids', []),
+        "query": state['user_input'],
+        "keywords": state.get('keywords', [])
     })
-    for p in results: p["source"] = "semantic"
-    return {"semantic_candidates": results}
+    return {
+        "tag_candidates": _tag_source(recall["tag"], "tag"),
+        "semantic_candidates": _tag_source(recall["semantic"], "semantic"),
+        "keyword_candidates": _tag_source(recall["keyword"], "keyword")
+    }
 
-async def track_keyword_recall(state: AgentState):
-    """Track 3: Keyword (Literal)"""
-    keywords = state.get('keywords', [])
-    results = await search_projects_fulltext.ainvoke({
-        "keywords": keywords, 
-        "k": 5
-    })
-    for p in results: p["source"] = "keyword"
-    return {"keyword_candidates": results}
+DEDUP_NUM_PERM = 64
+_SHINGLE_NOISE_RE = re.compile(r'[\W_]+')
+
+def _minhash(text: str, k: int = 3) -> MinHash:
+    """
+    MinHash over character k-shingles of text with whitespace and punctuation removed.
+    Character shingles (not word n-grams) because descriptions are mostly Chinese,
+    which str.split() does not tokenize.
+    """
+    norm = _SHINGLE_NOISE_RE.sub('', text.casefold())
+    shingles = {norm[i:i+k].encode('utf-8') for i in range(max(len(norm) - k + 1, 1))}
+    minhash = MinHash(num_perm=DEDUP_NUM_PERM)
+    minhash.update_batch(list(shingles))
+    return minhash
+
+class _CandidateColumns:
+    """
+    Parallel columns (SoA) for rerank, one row per unique project.
+    The first track to return a project owns its record; each track has its own
+    merger that writes only its score column, so no per-candidate source check.
+    """
+    __slots__ = ("records", "dedup_texts", "tag_scores", "semantic_scores", "keyword_scores", "row_of")
+
+    def __init__(self):
+        self.records, self.dedup_texts = [], []
+        self.tag_scores, self.semantic_scores, self.keyword_scores = [], [], []
+        self.row_of = {}  # project id -> row index
+
+    def _row(self, p) -> int:
+        row = self.row_of.get(p['id'])
+        if row is None:
+            row = self.row_of[p['id']] = len(self.records)
+            self.records.append(p)
+            # Dedup text: Title + description; None if the record has no title
+            title = p.get('title')
+            self.dedup_texts.append(f"{title} {p.get('description', '')}" if title is not None else None)
+            self.tag_scores.append(0.0)
+            self.semantic_scores.append(0.0)
+            self.keyword_scores.append(0.0)
+        return row
+
+    def merge_tag(self, source_list):
+        for p in source_list:
+            self.tag_scores[self._row(p)] = p.get("score", 0.0)
+
+    def merge_semantic(self, source_list):
+        for p in source_list:
+            self.semantic_scores[self._row(p)] = p.get("score", 0.0)
+
+    def merge_keyword(self, source_list):
+        for p in source_list:
+            self.keyword_scores[self._row(p)] = p.get("score", 0.0)
 
 async def rerank_node(state: AgentState):
     """
     Step 3: Merge and Rerank.
-    Includes content-based deduplication.
+    Includes near-duplicate content deduplication.
     """
     # Reranking is mostly CPU bound, but making it async ensures consistent graph execution
     # and allows yielding control if needed.
-    candidates = {}
     
-    def merge(source_list, source_name):
-        if not source_list: return
-        for p in source_list:
-            pid = p['id']
-            if pid not in candidates:
-                candidates[pid] = p
-            else:
-                # Merge scores
-                if source_name == "semantic":
-                    candidates[pid]["semantic_score"] = p.get("score", 0)
-                elif source_name == "keyword":
-                    candidates[pid]["keyword_score"] = p.get("score", 0)
+    # --- Fused Merge (structure of arrays) ---
+    cols = _CandidateColumns()
+    cols.merge_tag(state.get("tag_candidates") or [])
+    cols.merge_semantic(state.get("semantic_candidates") or [])
+    cols.merge_keyword(state.get("keyword_candidates") or [])
+    records, dedup_texts = cols.records, cols.dedup_texts
     
-    merge(state.get("tag_candidates", []), "tag")
-    merge(state.get("semantic_candidates", []), "semantic")
-    merge(state.get("keyword_candidates", []), "keyword")
+    # --- Vectorized Scoring ---
+    # Weighted Sum
+    final_scores = (
+        0.4 * np.asarray(cols.tag_scores, dtype=np.float32)
+        + 0.4 * np.asarray(cols.semantic_scores, dtype=np.float32)
+        + 0.2 * np.asarray(cols.keyword_scores, dtype=np.float32)
+    )
+    final_list = final_scores.tolist()
+    for data, final_score in zip(records, final_list):
+        data["final_score"] = final_score
     
+    # --- Near-duplicate Deduplication (MinHash LSH) ---
+    # Walk best-first: any LSH hit (estimated Jaccard >= 0.9) is a near-duplicate of a
+    # higher-scored project that is already kept. Rows without a title are dropped
+    # (Semantic might miss it if raw doc chunks are used directly without DB lookup).
+    lsh = MinHashLSH(threshold=0.9, num_perm=DEDUP_NUM_PERM)
     candidates_list = []
-    # Deduplication map: signature -> project_data
-    # Signature can be (title + first 50 chars of description) to detect duplicates
-    unique_map = {}
-    
-    for pid, data in candidates.items():
-        tag_score = data.get("score", 0.0) if data.get("source") == "tag" else 0.0
-        semantic_score = data.get("score", 0.0) if data.get("source") == "semantic" else data.get("semantic_score", 0.0)
-        keyword_score = data.get("score", 0.0) if data.get("source") == "keyword" else data.get("keyword_score", 0.0)
+    for idx in np.argsort(-final_scores, kind="stable").tolist():
+        if dedup_texts[idx] is None:
+            continue
+        minhash = _minhash(dedup_texts[idx])
+        if lsh.query(minhash):
+            continue
+        lsh.insert(idx, minhash)
+        candidates_list.append(records[idx])
+        if len(candidates_list) == 15:
+            break
         
-        # Weighted Sum
-        final_score = (tag_score * 0.4) + (semantic_score * 0.4) + (keyword_score * 0.2)
-        data["final_score"] = final_score
-        
-        # Ensure title exists (Semantic might miss it if raw doc chunks are used directly without DB lookup)
-        if "title" not in data: 
-             continue
-             
-        # --- Content-based Deduplication ---
-        # Generate a signature for the requirement content
-        title = data.get('title', '').strip()
-        desc = data.get('description', '').strip()
-        # Create a simple signature: Title + first 100 chars of description (normalized)
-        signature = f"{title.lower()}_{desc[:100].lower()}"
-        
-        if signature in unique_map:
-            existing = unique_map[signature]
-            # Keep the one with higher score, or just the first one encountered?
-            # Let's keep the one with higher score
-            if final_score > existing["final_score"]:
-                unique_map[signature] = data
-        else:
-            unique_map[signature] = data
-            
-    # Convert unique map back to list
-    candidates_list = list(unique_map.values())
-        
-    candidates_list.sort(key=lambda x: x["final_score"], reverse=True)
-    return {"ranked_projects": candidates_list[:15]}
+    return {"ranked_projects": candidates_list}
 
 
 from langchain_core.runnables import RunnableConfig
 
+# Prompt and LLM client are immutable for the process lifetime: build them once.
+_REASONING_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", REASONING_GEN_SYSTEM_PROMPT),
+    ("human", REASONING_GEN_HUMAN_PROMPT)
+])
+
+@functools.cache
+def _reasoning_chain():
+    # Built on first use rather than at import, so importing the graph does not require DASHSCOPE_API_KEY
+    return _REASONING_PROMPT | Config.get_reasoning_llm()
+
 async def reasoning_gen_node(state: AgentState, config: RunnableConfig):
     """
     Step 4: LLM Generation (Selection & Reasoning).
@@ -196,20 +247,12 @@ async def reasoning_gen_node(state: AgentState, config: RunnableConfig):
         "interest_tags": interest_tags,
         "skill_tags": skill_tags
     }
-    tags_json = json.dumps(tags_info, ensure_ascii=False)
+    tags_json = orjson.dumps(tags_info, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
     
     # Serialize projects
-    projects_json = json.dumps(ranked_projects, ensure_ascii=False)
-    
-    llm = Config.get_reasoning_llm()
-    system_prompt = REASONING_GEN_SYSTEM_PROMPT
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", REASONING_GEN_HUMAN_PROMPT)
-    ])
+    projects_json = orjson.dumps(ranked_projects, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
     
-    chain = prompt | llm
-    response = await chain.ainvoke({
+    response = await _reasoning_chain().ainvoke({
         "user_input": user_input,
         "tags_info": tags_json,
         "projects": projects_json
@@ -231,7 +274,7 @@ async def reasoning_parse_node(state: AgentState):
     try:
         json_str = ""
         # 1. Try markdown code block
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, re.DOTALL | re.IGNORECASE)
+        json_match = _JSON_BLOCK_RE.search(content)
         if json_match:
             json_str = json_match.group(1)
         else:
@@ -252,7 +295,7 @@ async def reasoning_parse_node(state: AgentState):
         
         if json_str:
             profile_data = json.loads(json_str)
-    except:
+    except ValueError:  # Includes json.JSONDecodeError
         pass
         
     return {"profile_data": profile_data}
@@ -261,20 +304,14 @@ async def reasoning_parse_node(state: AgentState):
 workflow = StateGraph(AgentState)
 
 workflow.add_node("analyze_query", analyze_query_node)
-workflow.add_node("track_tag_recall", track_tag_recall)
-workflow.add_node("track_semantic_recall", track_semantic_recall)
-workflow.add_node("track_keyword_recall", track_keyword_recall)
+workflow.add_node("parallel_recall", parallel_recall_node)
 workflow.add_node("rerank", rerank_node)
 workflow.add_node("reasoning_gen", reasoning_gen_node)
 workflow.add_node("reasoning_parse", reasoning_parse_node)
 
 workflow.set_entry_point("analyze_query")
-workflow.add_edge("analyze_query", "track_tag_recall")
-workflow.add_edge("analyze_query", "track_semantic_recall")
-workflow.add_edge("analyze_query", "track_keyword_recall")
-workflow.add_edge("track_tag_recall", "rerank")
-workflow.add_edge("track_semantic_recall", "rerank")
-workflow.add_edge("track_keyword_recall", "rerank")
+workflow.add_edge("analyze_query", "parallel_recall")
+workflow.add_edge("parallel_recall", "rerank")
 workflow.add_edge("rerank", "reasoning_gen")
 workflow.add_edge("reasoning_gen", "reasoning_parse")
 workflow.add_edge("reasoning_parse", END)
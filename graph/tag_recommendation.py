@@ -1,5 +1,6 @@
 import sys
 import os
+import functools
 import json
 import re
 from typing import List, Dict, Any
@@ -7,8 +8,30 @@ from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
 from core.config import Config
 from core.prompts import TAG_RECOMMENDATION_SYSTEM_PROMPT, TAG_RECOMMENDATION_HUMAN_PROMPT
-from tools.search_tools import extract_keywords, retrieve_tags
+from tools.search_tools import (
+    extract_keywords, retrieve_tags, embed_for_cache,
+    KEYWORDS_CACHE, KEYWORDS_CACHE_THRESHOLD, TAGS_CACHE_THRESHOLD
+)
 from langchain_core.runnables import RunnableConfig
+from core.semantic_cache import SemanticCache
+
+# Final recommendations keyed by requirement-text embedding. A hit skips keyword
+# extraction, tag retrieval and the reasoning LLM; the threshold is stricter than the
+# keyword/tag caches because the cached value is the user-facing answer.
+RECOMMENDATION_CACHE = SemanticCache(max_size=1024, ttl_seconds=300)
+RECOMMENDATION_CACHE_THRESHOLD = 0.97
+# Candidate tags retrieved for the requirement text and its keywords
+TAGS_CACHE = SemanticCache(max_size=1024, ttl_seconds=300)
+
+_RECOMMENDATION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", TAG_RECOMMENDATION_SYSTEM_PROMPT),
+    ("human", TAG_RECOMMENDATION_HUMAN_PROMPT)
+])
+
+@functools.cache
+def _recommendation_chain():
+    """Process-wide prompt | LLM chain, created lazily on the first recommendation."""
+    return _RECOMMENDATION_PROMPT | Config.get_reasoning_llm()
 
 async def recommend_tags_logic(description: str, research_direction: str, skill: str, config: RunnableConfig = None) -> str:
     """
@@ -19,28 +42,32 @@ async def recommend_tags_logic(description: str, research_direction: str, skill:
     # 1. Construct query context
     query_text = f"{description} {research_direction} {skill}"
     
+    query_emb = await embed_for_cache(query_text)
+    cached = RECOMMENDATION_CACHE.check(query_emb, RECOMMENDATION_CACHE_THRESHOLD) if query_emb else None
+    if cached is not None:
+        return cached
+
     # 2. Extract Keywords
-    keywords = await extract_keywords.ainvoke(query_text)
+    keywords = KEYWORDS_CACHE.check(query_emb, KEYWORDS_CACHE_THRESHOLD) if query_emb else None
+    if keywords is None:
+        keywords = await extract_keywords.ainvoke(query_text)
+        if query_emb and keywords and keywords != [query_text]:  # Skip the error fallback
+            KEYWORDS_CACHE.put(query_emb, keywords)
     queries = [query_text] + keywords
     
     # 3. Retrieve Candidate Tags
-    retrieval_res = await retrieve_tags.ainvoke({"queries": queries})
+    retrieval_res = TAGS_CACHE.check(query_emb, TAGS_CACHE_THRESHOLD) if query_emb else None
+    if retrieval_res is None:
+        retrieval_res = await retrieve_tags.ainvoke({"queries": queries})
+        if query_emb and (retrieval_res['interest_ids'] or retrieval_res['skill_ids']):
+            TAGS_CACHE.put(query_emb, retrieval_res)
     context_str = retrieval_res['context_str']
     
     # 4. LLM Reasoning
-    llm = Config.get_reasoning_llm()
-    system_prompt = TAG_RECOMMENDATION_SYSTEM_PROMPT
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", TAG_RECOMMENDATION_HUMAN_PROMPT)
-    ])
-    
-    chain = prompt | llm
-    
     # We use invoke here. For streaming, the calling node in LangGraph 
     # should be part of a stream capable graph. 
     # Since we want to stream tokens to the frontend, this node needs to be connected to the graph.
-    response = await chain.ainvoke({
+    response = await _recommendation_chain().ainvoke({
         "query_text": query_text,
         "context": context_str
     }, config=config)
@@ -56,4 +83,6 @@ async def recommend_tags_logic(description: str, research_direction: str, skill:
     except Exception:
         pass
 
+    if query_emb and content:
+        RECOMMENDATION_CACHE.put(query_emb, content)
     return content
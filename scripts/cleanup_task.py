@@ -2,8 +2,16 @@
 import os
 import sys
 import time
+import asyncio
 import logging
 
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,57 +23,132 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = os.path.join(project_root, "tmp")
+
+def sweep_stale_files(tmp_dir=TMP_DIR, max_age=3600):
+    """Delete every file in tmp_dir older than max_age seconds. Returns the number removed."""
+    now = time.time()
+    count = 0
+    for filename in os.listdir(tmp_dir):
+        file_path = os.path.join(tmp_dir, filename)
+        if os.path.isfile(file_path):
+            # Check modification time
+            if now - os.path.getmtime(file_path) > max_age:
+                try:
+                    os.remove(file_path)
+                    count += 1
+                    logger.info(f"Deleted stale file: {filename}")
+                except Exception as e:
+                    logger.error(f"Error deleting {filename}: {e}")
+    return count
+
 def cleanup_stale_files(interval=3600, max_age=3600):
     """
-    Clean up stale files in the tmp directory.
-    
+    Clean up stale files in the tmp directory by polling.
+    Fallback for platforms where watchdog has no native backend (see watch_stale_files).
+
     Args:
         interval (int): How often to run the cleanup (in seconds). Default 1 hour.
         max_age (int): How old a file must be to be deleted (in seconds). Default 1 hour.
     """
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    tmp_dir = os.path.join(project_root, "tmp")
-    
-    logger.info(f"Starting cleanup service. Monitoring {tmp_dir}")
-    
+    logger.info(f"Starting cleanup service (polling). Monitoring {TMP_DIR}")
+
     while True:
         try:
-            if not os.path.exists(tmp_dir):
-                logger.warning(f"Directory {tmp_dir} does not exist. Skipping.")
+            if not os.path.exists(TMP_DIR):
+                logger.warning(f"Directory {TMP_DIR} does not exist. Skipping.")
             else:
-                now = time.time()
-                count = 0
-                for filename in os.listdir(tmp_dir):
-                    file_path = os.path.join(tmp_dir, filename)
-                    if os.path.isfile(file_path):
-                        # Check modification time
-                        if now - os.path.getmtime(file_path) > max_age:
-                            try:
-                                os.remove(file_path)
-                                count += 1
-                                logger.info(f"Deleted stale file: {filename}")
-                            except Exception as e:
-                                logger.error(f"Error deleting {filename}: {e}")
-                
+                count = sweep_stale_files(TMP_DIR, max_age)
                 if count > 0:
                     logger.info(f"Cleanup cycle completed. Removed {count} files.")
-            
+
             # Wait for next cycle
             time.sleep(interval)
-            
+
         except Exception as e:
             logger.error(f"Error in cleanup loop: {e}")
             time.sleep(60) # Retry after 1 minute if critical error
 
+class _ExpiryScheduler(FileSystemEventHandler):
+    """
+    Schedules each file's deletion at mtime + max_age on the asyncio loop.
+    Watchdog callbacks arrive on the observer thread, so they hop onto the loop
+    with call_soon_threadsafe.
+    """
+
+    def __init__(self, loop, max_age):
+        self.loop = loop
+        self.max_age = max_age
+
+    def schedule(self, file_path):
+        try:
+            delay = os.path.getmtime(file_path) + self.max_age - time.time()
+        except OSError:
+            return  # Already gone
+        self.loop.call_later(max(delay, 0), self.expire, file_path)
+
+    def expire(self, file_path):
+        try:
+            if time.time() - os.path.getmtime(file_path) < self.max_age:
+                # Modified since it was scheduled: push deletion back to the new mtime + max_age
+                self.schedule(file_path)
+                return
+            os.remove(file_path)
+            logger.info(f"Deleted stale file: {os.path.basename(file_path)}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting {file_path}: {e}")
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.loop.call_soon_threadsafe(self.schedule, event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.loop.call_soon_threadsafe(self.schedule, event.dest_path)
+
+async def watch_stale_files(max_age=3600):
+    """
+    Event-driven cleanup: no periodic directory scans, and files are removed when
+    their TTL expires rather than on the next polling cycle.
+    """
+    os.makedirs(TMP_DIR, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    handler = _ExpiryScheduler(loop, max_age)
+
+    observer = Observer()
+    observer.schedule(handler, TMP_DIR, recursive=False)
+    observer.start()
+    logger.info(f"Starting cleanup service (watchdog). Monitoring {TMP_DIR}")
+
+    try:
+        # Reschedule files that already existed before the watcher started
+        for filename in os.listdir(TMP_DIR):
+            file_path = os.path.join(TMP_DIR, filename)
+            if os.path.isfile(file_path):
+                handler.schedule(file_path)
+        await asyncio.Event().wait()  # Run until interrupted
+    finally:
+        observer.stop()
+        observer.join()
+
 if __name__ == "__main__":
     # Allow command line overrides
     try:
         # Check if run as a one-off script
         if "--once" in sys.argv:
-            cleanup_stale_files(interval=0, max_age=3600)
+            if os.path.exists(TMP_DIR):
+                logger.info(f"Removed {sweep_stale_files(TMP_DIR, max_age=3600)} stale files.")
             sys.exit(0)
-            
+
         # Run as daemon
-        cleanup_stale_files()
+        if "--polling" in sys.argv or Observer is None:
+            if Observer is None:
+                logger.warning("watchdog is not installed; falling back to polling.")
+            cleanup_stale_files()
+        else:
+            asyncio.run(watch_stale_files())
     except KeyboardInterrupt:
         logger.info("Stopping cleanup service.")
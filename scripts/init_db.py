@@ -9,7 +9,17 @@ print("Script started...")
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from core.db import PostgresPool
+from core.db import PostgresPool, MySQLPool
+
+# Secondary indexes for the agent's recommendation queries: (table, index, columns).
+# The tables belong to the Django project; these only add read paths.
+# - status filter on every project query (InnoDB appends the id PK to the index anyway)
+# - tag -> project lookups, index-only for the tag match counting
+MYSQL_INDEXES = [
+    ("project_requirement", "idx_status_id", "status, id"),
+    ("project_requirement_tag1", "idx_tag1_req", "tag1_id, requirement_id"),
+    ("project_requirement_tag2", "idx_tag2_req", "tag2_id, requirement_id"),
+]
 
 async def main():
     print("Connecting to PostgreSQL to initialize tables...")
@@ -24,9 +34,33 @@ async def main():
         await checkpointer.setup()
         print("Successfully initialized checkpoint tables.")
 
+def create_mysql_indexes():
+    """Create MYSQL_INDEXES that don't exist yet (MySQL has no CREATE INDEX IF NOT EXISTS)."""
+    print("Creating MySQL indexes for recommendation queries...")
+    with MySQLPool.get_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            for table, name, columns in MYSQL_INDEXES:
+                cursor.execute(
+                    """
+                    SELECT 1 FROM information_schema.statistics
+                    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+                    LIMIT 1
+                    """,
+                    (table, name)
+                )
+                if cursor.fetchone():
+                    print(f"Index {name} on {table} already exists.")
+                    continue
+                cursor.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+                print(f"Created index {name} on {table} ({columns}).")
+        finally:
+            cursor.close()
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
+        create_mysql_indexes()
     except Exception as e:
         print(f"Failed to initialize tables: {e}")
         sys.exit(1)
@@ -0,0 +1,60 @@
+import os
+import sys
+import logging
+
+# Ensure langchain-v2.0 root is in sys.path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+langchain_root = os.path.dirname(current_dir)
+if langchain_root not in sys.path:
+    sys.path.append(langchain_root)
+
+from core.config import Config
+from pymilvus import MilvusClient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Rebuilds the vector index of existing collections whose index type or metric differs
+# from Config.MILVUS_VECTOR_INDEXES (e.g. tag collections created by LangChain with L2,
+# or project_raw_docs on IVF_FLAT). Only the index is rebuilt: stored vectors are kept,
+# nothing is re-embedded. A collection is unsearchable between release and load.
+#
+#   python scripts/reindex_milvus.py
+
+def reindex_collection(client: MilvusClient, collection_name: str, target: dict) -> bool:
+    """Rebuild collection_name's vector index as target if it differs. Returns True if rebuilt."""
+    index_names = client.list_indexes(collection_name, field_name="vector")
+    if index_names:
+        current = client.describe_index(collection_name, index_names[0])
+        if (current.get("index_type"), current.get("metric_type")) == (target["index_type"], target["metric_type"]):
+            logger.info(f"'{collection_name}': already {target['index_type']}/{target['metric_type']}, skipped.")
+            return False
+        logger.info(
+            f"'{collection_name}': {current.get('index_type')}/{current.get('metric_type')} -> "
+            f"{target['index_type']}/{target['metric_type']}, rebuilding..."
+        )
+    else:
+        logger.info(f"'{collection_name}': no vector index, building {target['index_type']}/{target['metric_type']}...")
+
+    client.release_collection(collection_name)
+    for name in index_names:
+        client.drop_index(collection_name, name)
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name="vector", **target)
+    client.create_index(collection_name, index_params=index_params)
+    client.load_collection(collection_name)
+    return True
+
+def reindex_milvus():
+    client = MilvusClient(uri=f"http://{Config.MILVUS_HOST}:{Config.MILVUS_PORT}")
+    rebuilt = 0
+    for collection_name, target in Config.MILVUS_VECTOR_INDEXES.items():
+        if not client.has_collection(collection_name):
+            logger.info(f"'{collection_name}': collection does not exist, skipped.")
+            continue
+        rebuilt += reindex_collection(client, collection_name, target)
+    logger.info(f"Reindex complete ({rebuilt} rebuilt). Restart the server so its stores pick up the new indexes.")
+
+if __name__ == "__main__":
+    reindex_milvus()
@@ -1,6 +1,9 @@
 import os
 import sys
+import asyncio
+import hashlib
 import logging
+import sqlite3
 from typing import List, Dict
 
 # Ensure langchain-v2.0 root is in sys.path
@@ -18,69 +21,155 @@ except ImportError:
     load_dotenv(os.path.join(langchain_root, '.env'))
 
 from core.config import Config
-from langchain_core.documents import Document
+from core.db import MySQLPool
+import numpy as np
+import pymysql
 from pymilvus import CollectionSchema, FieldSchema, DataType, MilvusClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def vectorize_projects():
+EMBED_BATCH_SIZE = 10       # DashScope text-embedding-v3/v4 per-request input limit
+EMBED_CONCURRENCY = 8       # In-flight embedding requests
+FETCH_CHUNK_SIZE = 1024     # Rows fetched from MySQL, embedded and inserted per round
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(current_dir, "embedding_cache.db"))
+CACHE_LOOKUP_CHUNK = 500    # Keeps IN (...) under SQLite's bound-parameter limit
+
+# --- Embedding Cache ---
+# Content hash -> float32 vector, so re-runs only embed projects whose text changed.
+# float32 is what Milvus stores, so a cache hit inserts exactly what a fresh embedding would.
+EMBEDDING_CACHE_TABLE = "cache_f32"  # float16 rows from older runs (table 'cache') are ignored
+
+def _content_hash(text: str) -> str:
+    # The model name is part of the key: vectors from different models are not interchangeable
+    return hashlib.sha256(f"{Config.EMBEDDING_MODEL}\0{text}".encode("utf-8")).hexdigest()
+
+def _open_embedding_cache() -> sqlite3.Connection:
+    cache = sqlite3.connect(EMBEDDING_CACHE_PATH)
+    cache.execute(f"CREATE TABLE IF NOT EXISTS {EMBEDDING_CACHE_TABLE} (sha256 TEXT PRIMARY KEY, vector BLOB)")
+    return cache
+
+def _load_cached_vectors(cache: sqlite3.Connection, hashes: List[str]) -> Dict[str, List[float]]:
+    found = {}
+    for i in range(0, len(hashes), CACHE_LOOKUP_CHUNK):
+        chunk = hashes[i:i+CACHE_LOOKUP_CHUNK]
+        rows = cache.execute(
+            f"SELECT sha256, vector FROM {EMBEDDING_CACHE_TABLE} WHERE sha256 IN ({','.join('?' * len(chunk))})", chunk
+        )
+        for sha, blob in rows:
+            found[sha] = np.frombuffer(blob, dtype=np.float32).tolist()
+    return found
+
+def _store_cached_vectors(cache: sqlite3.Connection, entries: Dict[str, List[float]]):
+    with cache:
+        cache.executemany(
+            f"INSERT OR REPLACE INTO {EMBEDDING_CACHE_TABLE} (sha256, vector) VALUES (?, ?)",
+            ((sha, np.asarray(vec, dtype=np.float32).tobytes()) for sha, vec in entries.items())
+        )
+
+async def _embed_batches(embeddings_service, batch_texts: List[List[str]]) -> list:
+    """Embed all batches concurrently; a failed batch yields its exception instead of vectors."""
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_one(texts: List[str]) -> List[List[float]]:
+        async with sem:
+            return await embeddings_service.aembed_documents(texts)
+
+    return await asyncio.gather(*[embed_one(t) for t in batch_texts], return_exceptions=True)
+
+def _fetch_project_chunk(after_id: int, size: int) -> List[Dict]:
+    """
+    Next page of projects with id > after_id (keyset pagination on the primary key).
+    Buffered, and the connection goes back to the pool before the chunk is embedded,
+    so no MySQL stream is held open (net_write_timeout) across slow embedding calls.
+    """
+    with MySQLPool.get_conn() as conn:
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        try:
+            cursor.execute(
+                """
+                SELECT id, title, description, brief, status
+                FROM project_requirement
+                WHERE status IN ('under_review', 'in_progress', 'completed') AND id > %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                (after_id, size)
+            )
+            return list(cursor.fetchall())
+        finally:
+            cursor.close()
+
+async def _vectorize_chunk(client, collection_name: str, embeddings_service, cache: sqlite3.Connection, rows: List[Dict]) -> int:
+    """Embed (through the cache) and insert one chunk of project rows. Returns the number inserted."""
+    ids = [p['id'] for p in rows]
+    # Combine text for embedding
+    texts = [f"{p['title']} {p.get('brief', '')} {p.get('description', '')}" for p in rows]
+    hashes = [_content_hash(t) for t in texts]
+    
+    vectors_by_hash = _load_cached_vectors(cache, hashes)
+    miss_idx = [i for i, h in enumerate(hashes) if h not in vectors_by_hash]
+    
+    # Batch process: DashScope caps inputs per request, so fan the batches out
+    # concurrently (bounded) instead of awaiting them one after another.
+    batches = [miss_idx[i:i+EMBED_BATCH_SIZE] for i in range(0, len(miss_idx), EMBED_BATCH_SIZE)]
+    results = await _embed_batches(embeddings_service, [[texts[j] for j in b] for b in batches])
+    
+    new_vectors = {}
+    for batch, vectors in zip(batches, results):
+        if isinstance(vectors, BaseException):
+            logger.error(f"Error embedding batch starting at id {ids[batch[0]]}: {vectors}")
+            continue
+        new_vectors.update((hashes[j], vector) for j, vector in zip(batch, vectors))
+    _store_cached_vectors(cache, new_vectors)
+    vectors_by_hash.update(new_vectors)
+
+    # Reassemble in original order; projects whose batch failed are skipped
+    data = [
+        {
+            "id": pid,
+            "vector": vectors_by_hash[h],
+            "project_id": pid,
+            "text": text
+        }
+        for pid, text, h in zip(ids, texts, hashes) if h in vectors_by_hash
+    ]
+    logger.info(f"Embedding cache: {len(rows) - len(miss_idx)} hits, {len(miss_idx)} embedded, {len(rows) - len(data)} failed.")
+    
+    if data:
+        client.insert(collection_name=collection_name, data=data)
+    return len(data)
+
+async def vectorize_projects():
     logger.info("Starting project vectorization...")
     
-    # 1. Fetch Projects from MySQL
-    conn = Config.get_db_connection()
-    projects = []
+    # 1. Fetch Projects from MySQL, one keyset page at a time
     try:
-        cursor = conn.cursor()
-        # Fetch relevant projects
-        query = """
-            SELECT id, title, description, brief, status
-            FROM project_requirement
-            WHERE status IN ('under_review', 'in_progress', 'completed')
-        """
-        cursor.execute(query)
-        columns = [col[0] for col in cursor.description]
-        for row in cursor.fetchall():
-            projects.append(dict(zip(columns, row)))
-        logger.info(f"Fetched {len(projects)} projects from database.")
+        first_chunk = _fetch_project_chunk(0, FETCH_CHUNK_SIZE)
     except Exception as e:
         logger.error(f"Database error: {e}")
         return
-    finally:
-        if conn:
-            conn.close()
 
-    if not projects:
+    if not first_chunk:
         logger.warning("No projects to vectorize.")
         return
 
-    # 2. Prepare Documents
-    documents = []
-    ids = []
-    for p in projects:
-        # Combine text for embedding
-        text = f"{p['title']} {p.get('brief', '')} {p.get('description', '')}"
-        
-        # We need to store project_id in metadata/fields
-        doc = Document(page_content=text, metadata={"project_id": p['id']})
-        documents.append(doc)
-        ids.append(p['id'])
-
-    # 3. Setup Milvus Collection
+    # 2. Setup Milvus Collection
     collection_name = "project_embeddings"
     dim = 1536 # v4
-    
+
     # We use MilvusClient for easier management or Config.get_milvus_store
     # Config.get_milvus_store returns a LangChain VectorStore wrapper (Milvus)
     # But we might want to ensure the collection schema is correct first (drop old one)
-    
+
     client = MilvusClient(uri=f"http://{Config.MILVUS_HOST}:{Config.MILVUS_PORT}")
-    
+
     if client.has_collection(collection_name):
         logger.info(f"Dropping existing collection '{collection_name}'...")
         client.drop_collection(collection_name)
-        
+    
     logger.info(f"Creating collection '{collection_name}' with dim={dim}...")
     # Define schema explicitly to match what we want
     schema = MilvusClient.create_schema(
@@ -91,54 +180,48 @@ def vectorize_projects():
     schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=dim)
     schema.add_field(field_name="project_id", datatype=DataType.INT64)
     schema.add_field(field_name="text", datatype=DataType.VARCHAR, max_length=65535) # Content
-    
-    index_params = client.prepare_index_params()
-    index_params.add_index(
-        field_name="vector", 
-        index_type="AUTOINDEX",
-        metric_type="COSINE"
-    )
-    
+
+    # Created without an index: building it once after the bulk load is cheaper
+    # than maintaining it across every insert
     client.create_collection(
         collection_name=collection_name,
-        schema=schema,
-        index_params=index_params
+        schema=schema
     )
-    
-    # 4. Vectorize and Insert
+
+    # 3. Vectorize and Insert, one chunk at a time
     logger.info("Generating embeddings and inserting...")
-    
+
     # Use Config.get_embeddings() to get the embedding function
     embeddings_service = Config.get_embeddings()
-    
-    # Batch process
-    batch_size = 50
-    total = len(documents)
-    
-    for i in range(0, total, batch_size):
-        batch_docs = documents[i:i+batch_size]
-        batch_ids = ids[i:i+batch_size]
-        batch_texts = [d.page_content for d in batch_docs]
-        
-        try:
-            vectors = embeddings_service.embed_documents(batch_texts)
-            
-            data = []
-            for j, vector in enumerate(vectors):
-                data.append({
-                    "id": batch_ids[j],
-                    "vector": vector,
-                    "project_id": batch_ids[j],
-                    "text": batch_texts[j]
-                })
-                
-            client.insert(collection_name=collection_name, data=data)
-            logger.info(f"Processed {min(i+batch_size, total)}/{total}")
-            
-        except Exception as e:
-            logger.error(f"Error processing batch {i}: {e}")
+
+    cache = _open_embedding_cache()
+    total = inserted = 0
+    rows = first_chunk
+    try:
+        while rows:
+            total += len(rows)
+            try:
+                inserted += await _vectorize_chunk(client, collection_name, embeddings_service, cache, rows)
+            except Exception as e:
+                logger.error(f"Error processing chunk ending at id {rows[-1]['id']}: {e}")
+            logger.info(f"Processed {total} projects ({inserted} inserted)")
+            if len(rows) < FETCH_CHUNK_SIZE:
+                break
+            rows = _fetch_project_chunk(rows[-1]['id'], FETCH_CHUNK_SIZE)
+    finally:
+        cache.close()
+
+    # 4. Build the index over the loaded data, then make the collection searchable
+    logger.info("Flushing and building index...")
+    client.flush(collection_name)
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name="vector", **Config.MILVUS_VECTOR_INDEXES[collection_name])
+    # retrieve_project_summary filters on project_id
+    index_params.add_index(field_name="project_id", index_type="STL_SORT")
+    client.create_index(collection_name, index_params=index_params)
+    client.load_collection(collection_name)
 
     logger.info("Project vectorization complete.")
 
 if __name__ == "__main__":
-    vectorize_projects()
+    asyncio.run(vectorize_projects())  # One event loop for the whole run
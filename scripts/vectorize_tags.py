@@ -1,6 +1,7 @@
 import os
 import sys
 import csv
+import asyncio
 import logging
 from typing import List, Dict
 
@@ -23,11 +24,15 @@ except ImportError:
     pass
 
 from langchain_core.documents import Document
+from pymilvus import DataType, MilvusClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+EMBED_BATCH_SIZE = 10       # DashScope text-embedding-v3/v4 per-request input limit
+EMBED_CONCURRENCY = 8       # In-flight embedding requests
+
 def load_csv_tags(file_path: str, tag_type: str) -> List[Document]:
     """
     Load tags from CSV and convert to LangChain Documents.
@@ -41,15 +46,27 @@ def load_csv_tags(file_path: str, tag_type: str) -> List[Document]:
         logger.error(f"File not found: {file_path}")
         return []
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    # csv.reader + precomputed column indices: no per-row dict or header-name hashing
+    with open(file_path, 'r', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        idx = {name.strip(): i for i, name in enumerate(header)}
+
+        def col(row, name):
+            i = idx.get(name)
+            return row[i].strip() if i is not None and i < len(row) else ''
+
         for row in reader:
             try:
-                tag_id = int(row['id'])
+                tag_id = int(row[idx['id']])
                 
                 if tag_type == 'tag1':
                     # Interest Tags: id, interest
-                    content = row.get('interest', '').strip()
+                    content = col(row, 'interest')
+                    if not content:
+                        continue
                     metadata = {
                         "id": tag_id,
                         "tag_name": content, # Standardize for retrieval
@@ -60,33 +77,79 @@ def load_csv_tags(file_path: str, tag_type: str) -> List[Document]:
                     # Skill Tags: id, skill, category, subcategory, specialty
                     # We want to embed the full context string for better semantic matching
                     # e.g. "互联网 后端开发 java"
-                    skill_name = row.get('skill', '').strip()
-                    category = row.get('category', '').strip()
-                    subcategory = row.get('subcategory', '').strip()
-                    specialty = row.get('specialty', '').strip()
+                    skill_name = col(row, 'skill')
                     
                     # Construct rich embedding content
                     # Format: "Category Subcategory Specialty"
-                    content = f"{skill_name}" 
+                    content = skill_name
+                    if not content:
+                        continue
+                    specialty = col(row, 'specialty')
                     
                     metadata = {
                         "id": tag_id,
                         "tag_name": specialty or skill_name,
                         "post": skill_name, # Original full path
-                        "category": category,
-                        "subcategory": subcategory,
+                        "category": col(row, 'category'),
+                        "subcategory": col(row, 'subcategory'),
                         "specialty": specialty,
                         "type": "skill"
                     }
                 
-                if content:
-                    doc = Document(page_content=content, metadata=metadata)
-                    documents.append(doc)
+                documents.append(Document(page_content=content, metadata=metadata))
             except Exception as e:
                 logger.warning(f"Skipping row {row}: {e}")
                 
     return documents
 
+async def _embed_texts(embeddings_service, texts: List[str]) -> List[List[float]]:
+    """Embed texts in provider-sized batches, EMBED_CONCURRENCY requests in flight at a time."""
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_one(batch: List[str]) -> List[List[float]]:
+        async with sem:
+            return await embeddings_service.aembed_documents(batch)
+
+    results = await asyncio.gather(*[
+        embed_one(texts[i:i+EMBED_BATCH_SIZE]) for i in range(0, len(texts), EMBED_BATCH_SIZE)
+    ])
+    return [vector for batch in results for vector in batch]
+
+def load_tag_collection(client: MilvusClient, collection_name: str, documents: List[Document], embeddings_service):
+    """
+    (Re)create a tag collection and bulk-load it: embed everything, insert once, then index.
+    
+    The schema mirrors what LangChain's Milvus store creates (auto-id "pk", "text",
+    "vector", one scalar field per metadata key), so retrieve_tags reads it unchanged.
+    """
+    # Embed first, so a failed run leaves the existing collection in place
+    vectors = asyncio.run(_embed_texts(embeddings_service, [d.page_content for d in documents]))
+    
+    if client.has_collection(collection_name):
+        logger.info(f"Dropping existing collection '{collection_name}'...")
+        client.drop_collection(collection_name)
+    
+    schema = MilvusClient.create_schema(auto_id=True, enable_dynamic_field=False)
+    schema.add_field(field_name="pk", datatype=DataType.INT64, is_primary=True)
+    schema.add_field(field_name="text", datatype=DataType.VARCHAR, max_length=65535)
+    schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=len(vectors[0]))
+    for key, value in documents[0].metadata.items():
+        if isinstance(value, int):
+            schema.add_field(field_name=key, datatype=DataType.INT64)
+        else:
+            schema.add_field(field_name=key, datatype=DataType.VARCHAR, max_length=65535)
+    client.create_collection(collection_name=collection_name, schema=schema)
+    
+    rows = [{"text": d.page_content, "vector": v, **d.metadata} for d, v in zip(documents, vectors)]
+    client.insert(collection_name=collection_name, data=rows)
+    
+    # Deferred index build: one pass over the loaded data instead of per-insert maintenance
+    client.flush(collection_name)
+    index_params = client.prepare_index_params()
+    index_params.add_index(field_name="vector", **Config.MILVUS_VECTOR_INDEXES[collection_name])
+    client.create_index(collection_name, index_params=index_params)
+    client.load_collection(collection_name)
+
 def vectorize_tags():
     """Main function to vectorize both tag files."""
     
@@ -107,19 +170,18 @@ def vectorize_tags():
         logger.error("No tags loaded. Exiting.")
         return
 
-    # 3. Initialize Vector Stores
-    # Using Config to get pre-configured Milvus instance with DashScope Embeddings
-    
+    # 3. Embed and Load Collections
     # Collection names must match what retrieval_tool.py expects:
     # "student_interests" for Tag 1
     # "student_skills" for Tag 2
     
+    client = MilvusClient(uri=f"http://{Config.MILVUS_HOST}:{Config.MILVUS_PORT}")
+    embeddings_service = Config.get_embeddings()
+    
     if docs_tag1:
         logger.info("Vectorizing Interest Tags to collection 'student_interests'...")
         try:
-            store_tag1 = Config.get_milvus_store("student_interests")
-            # Milvus.from_documents automatically handles collection creation and insertion
-            store_tag1.add_documents(docs_tag1)
+            load_tag_collection(client, "student_interests", docs_tag1, embeddings_service)
             logger.info("Successfully vectorized Interest Tags.")
         except Exception as e:
             logger.error(f"Failed to vectorize Interest Tags: {e}")
@@ -127,8 +189,7 @@ def vectorize_tags():
     if docs_tag2:
         logger.info("Vectorizing Skill Tags to collection 'student_skills'...")
         try:
-            store_tag2 = Config.get_milvus_store("student_skills")
-            store_tag2.add_documents(docs_tag2)
+            load_tag_collection(client, "student_skills", docs_tag2, embeddings_service)
             logger.info("Successfully vectorized Skill Tags.")
         except Exception as e:
             logger.error(f"Failed to vectorize Skill Tags: {e}")
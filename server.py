@@ -1,13 +1,21 @@
 
 import os
+import asyncio
 import uvicorn
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from langserve import add_routes
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from starlette.types import Message
 import json
+import orjson
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from core.db import PostgresPool
+from core.db import PostgresPool, AsyncMySQLPool
 
 # python server.py
 # API 文档 : http://localhost:8000/docs
@@ -31,17 +39,32 @@ from graph.publisher_main_agent import publisher_main_app as publisher_agent
 # QA Agent
 from graph.qa_agent import qa_app as qa_agent
 
+logger = logging.getLogger(__name__)
+
+def setup_logging() -> QueueListener:
+    """
+    Route root logging through a queue: records are queued by the caller and written
+    by the listener thread, so a log call never blocks the event loop on stream I/O.
+    Called from the lifespan, so merely importing this module leaves logging alone.
+    """
+    log_queue = queue.SimpleQueue()
+    logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+    return QueueListener(log_queue, logging.StreamHandler())
+
 # 3. Define Lifespan for Connection Pool Management
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def db_lifespan(app: FastAPI):
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__module__)
+    
     # Startup: Open Database Pool
     await PostgresPool.open_pool()
     
     # CRITICAL: Swap placeholder checkpointer with real AsyncPostgresSaver
     # This must be done inside the loop
-    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-    
     pool = PostgresPool.get_or_create_pool()
+    app.state.pool = pool  # Handlers read it from request.app.state
+    # Checkpoint tables are created/migrated once by scripts/init_db.py, not here:
+    # every worker runs this lifespan, and concurrent setup() migrations race.
     real_checkpointer = AsyncPostgresSaver(pool)
     
     # 1. Swap for Student Agent
@@ -54,17 +77,34 @@ async def lifespan(app: FastAPI):
     # 3. Swap for QA Agent
     qa_agent.checkpointer = real_checkpointer
     
-    print("Swapped In-Memory Checkpointers with AsyncPostgresSaver.")
+    logger.info("Swapped In-Memory Checkpointers with AsyncPostgresSaver.")
     
     yield
     # Shutdown: Close Database Pool
     await PostgresPool.close_pool()
+    await AsyncMySQLPool.close_pool()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    App lifespan: nests every startup/shutdown context so none is dropped.
+    Mounted sub-apps with their own lifespan go inside db_lifespan here, e.g.
+    `async with sub_app.router.lifespan_context(app):`.
+    """
+    log_listener = setup_logging()
+    log_listener.start()
+    try:
+        async with db_lifespan(app):
+            yield
+    finally:
+        log_listener.stop()  # Flushes queued records
 
 # 4. Create FastAPI app
 app = FastAPI(
     title="LangChain Agent Server",
     version="1.0",
     description="API server for Student and Publisher agents",
+    default_response_class=ORJSONResponse,  # orjson for handlers returning dicts (/health, delete, ...)
     lifespan=lifespan,
 )
 
@@ -79,63 +119,111 @@ app.add_middleware(
 )
 
 def per_req_config_modifier(config, request):
-    if "configurable" not in config:
-        config["configurable"] = {}
-    
-    # Priority 1: Check Headers (Best Practice - Lightweight & Standard)
-    # Support 'X-Thread-ID' or 'Thread-ID'
-    header_thread_id = request.headers.get("x-thread-id") or request.headers.get("thread-id")
-    if header_thread_id:
-        config["configurable"]["thread_id"] = header_thread_id
-        return config
-
-    # Priority 2: Check Query Parameters (Convenient for testing)
-    query_thread_id = request.query_params.get("thread_id")
-    if query_thread_id:
-        config["configurable"]["thread_id"] = query_thread_id
-        return config
-
-    # Priority 3: Fallback to Middleware-injected state (For JSON body support)
-    if "thread_id" not in config["configurable"]:
-        # Try to get from state injected by middleware
-        if hasattr(request.state, "thread_id"):
-            config["configurable"]["thread_id"] = request.state.thread_id
-            
+    configurable = config.setdefault("configurable", {})
+
+    # Priority 1: Headers ('X-Thread-ID' or 'Thread-ID'), then
+    # Priority 2: Query parameter (convenient for testing)
+    get_header = request.headers.get
+    thread_id = get_header("x-thread-id") or get_header("thread-id") or request.query_params.get("thread_id")
+    if thread_id:
+        configurable["thread_id"] = thread_id
+    elif "thread_id" not in configurable:
+        # Priority 3: Fallback to Middleware-injected state (For JSON body support)
+        thread_id = getattr(request.state, "thread_id", None)
+        if thread_id is not None:
+            configurable["thread_id"] = thread_id
+
     return config
 
+@app.get("/health")
+async def health():
+    """Liveness check with checkpoint pool statistics."""
+    return {"status": "ok", "postgres_pool": PostgresPool.get_stats()}
+
 # --- Custom History Management Endpoints ---
 
+# thread_id -> (checkpoint_id, response body). A thread's history only changes when a
+# new checkpoint is written, so the body is reused until the latest checkpoint_id moves.
+HISTORY_CACHE_SIZE = 256
+_history_cache: "OrderedDict[str, tuple[str, bytes]]" = OrderedDict()
+
+async def _latest_checkpoint_id(pool, thread_id: str):
+    """Latest root checkpoint id for a thread (same ordering AsyncPostgresSaver uses), or None."""
+    async with pool.connection() as conn:
+        cur = await conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = '' "
+            "ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id,),
+        )
+        row = await cur.fetchone()
+    return row[0] if row else None
+
 @app.get("/student/history/{thread_id}")
-async def get_chat_history(thread_id: str):
+async def get_chat_history(thread_id: str, request: Request):
     """
     Get chat history for a specific thread.
+    Responses carry the latest checkpoint_id as ETag: an unchanged thread is answered
+    with 304 (If-None-Match) or from the in-process cache without loading the state.
+    Otherwise messages are serialized one at a time and streamed.
     """
+    try:
+        checkpoint_id = await _latest_checkpoint_id(request.app.state.pool, thread_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if checkpoint_id is None:
+        _history_cache.pop(thread_id, None)
+        return {"messages": []}
+
+    etag = f'"{checkpoint_id}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cached = _history_cache.get(thread_id)
+    if cached and cached[0] == checkpoint_id:
+        _history_cache.move_to_end(thread_id)
+        return Response(content=cached[1], media_type="application/json", headers={"ETag": etag})
+
     config = {"configurable": {"thread_id": thread_id}}
     try:
         # Fetch state from the graph
         state = await student_agent.aget_state(config)
-        if not state.values:
-            return {"messages": []}
-            
-        messages = state.values.get("messages", [])
-        # Serialize messages
-        history = []
-        for msg in messages:
-            history.append({
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    messages = state.values.get("messages", []) if state.values else []
+    # A turn may have landed since the id lookup: key the cache on the state actually read
+    checkpoint_id = state.config["configurable"].get("checkpoint_id", checkpoint_id)
+    etag = f'"{checkpoint_id}"'
+
+    async def stream_history():
+        parts = [b'{"messages":[']
+        yield parts[0]
+        for i, msg in enumerate(messages):
+            item = orjson.dumps({
                 "type": msg.type,
                 "content": msg.content,
                 # Add other fields if needed
             })
-        return {"messages": history}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            parts.append(b"," + item if i else item)
+            yield parts[-1]
+        parts.append(b"]}")
+        yield parts[-1]
+
+        # Only a fully sent body is cached
+        _history_cache[thread_id] = (checkpoint_id, b"".join(parts))
+        _history_cache.move_to_end(thread_id)
+        if len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+
+    return StreamingResponse(stream_history(), media_type="application/json", headers={"ETag": etag})
 
 @app.delete("/student/history/{thread_id}")
-async def delete_chat_history(thread_id: str):
+async def delete_chat_history(thread_id: str, request: Request):
     """
     Delete chat history for a specific thread (Hard Delete).
     """
-    pool = PostgresPool.get_or_create_pool()
+    pool = request.app.state.pool
     try:
         async with pool.connection() as conn:
             # Delete from checkpoints and writes
@@ -143,11 +231,17 @@ async def delete_chat_history(thread_id: str):
             # Usually 'checkpoints', 'checkpoint_blobs', 'checkpoint_writes'
             # We filter by thread_id
             
-            # Using transactions to ensure atomicity
-            async with conn.transaction():
-                await conn.execute("DELETE FROM checkpoints WHERE thread_id = %s", (thread_id,))
-                await conn.execute("DELETE FROM checkpoint_blobs WHERE thread_id = %s", (thread_id,))
-                await conn.execute("DELETE FROM checkpoint_writes WHERE thread_id = %s", (thread_id,))
+            # One statement (data-modifying CTEs): a single round trip, and atomic on its own.
+            # psycopg binds parameters server-side, which rejects multi-statement strings.
+            await conn.execute(
+                """
+                WITH del_blobs AS (DELETE FROM checkpoint_blobs WHERE thread_id = %(thread_id)s),
+                     del_writes AS (DELETE FROM checkpoint_writes WHERE thread_id = %(thread_id)s)
+                DELETE FROM checkpoints WHERE thread_id = %(thread_id)s
+                """,
+                {"thread_id": thread_id},
+            )
+        _history_cache.pop(thread_id, None)
                 
         return {"status": "success", "message": f"History for thread {thread_id} deleted."}
     except Exception as e:
@@ -182,4 +276,19 @@ add_routes(
 )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # "auto" selects uvloop/httptools when installed (see requirements.txt) and falls
+    # back to asyncio/h11 where they are unavailable (e.g. Windows).
+    # Import-string form so uvicorn can spawn worker processes, each with its own loop.
+    # One worker unless WEB_CONCURRENCY is set: pools and in-process caches are per worker,
+    # and every worker pre-warms CHECKPOINT_POOL_MIN_SIZE connections, so keep
+    # CHECKPOINT_POOL_MAX_SIZE x workers under Postgres max_connections.
+    # In production, gunicorn -k uvicorn.workers.UvicornWorker.
+    uvicorn.run(
+        "server:app",
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+        loop="auto",
+        http="auto",
+    )
@@ -1,21 +1,45 @@
 
 import sys
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+import django
+from django.conf import settings
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+langchain_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(langchain_root)
+# Django apps (project, user, ...) live in the parent project
+sys.path.append(os.getenv("DJANGO_PROJECT_ROOT") or os.path.dirname(langchain_root))
 
-# Mock external dependencies
-sys.modules['project'] = MagicMock()
-sys.modules['project.models'] = MagicMock()
-sys.modules['project.services'] = MagicMock()
-sys.modules['user'] = MagicMock()
-sys.modules['user.models'] = MagicMock()
-sys.modules['django'] = MagicMock()
-sys.modules['django.conf'] = MagicMock()
-sys.modules['django.core.cache'] = MagicMock()
+# Minimal real Django (in-memory SQLite) instead of MagicMock'd modules: the graphs
+# import the actual models, and nothing here touches the database
+if not settings.configured:
+    settings.configure(
+        DEBUG=True,
+        SECRET_KEY='test',
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            }
+        },
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'user',
+            'organization',
+            'project',
+            'projectscore',
+            'studentproject',
+            'authentication',
+            'notification',
+        ],
+        MIGRATION_MODULES={'audit': None, 'admin_tool': None},
+        USE_TZ=True,
+        AUTH_USER_MODEL='user.User',
+    )
+    django.setup()
 
-# Also mock core.django_setup because we don't want real django setup
+# Settings are configured above; skip the project's settings-module setup
 with patch('core.django_setup.setup_django'):
     with patch.dict(os.environ, {"DASHSCOPE_API_KEY": "fake_key", "MILVUS_HOST": "localhost"}):
         try:
@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+aiomysql = pytest.importorskip("aiomysql")
+pytest.importorskip("langchain_core")
+
+from core.db import AsyncMySQLPool
+from tools import db_tools
+
+
+class FakeCursor:
+    def __init__(self, rows=(), fail_on=None):
+        self.rows = list(rows)
+        self.fail_on = fail_on
+        self.executed = []
+        self.rowcount = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("boom")
+        self.executed.append((sql, params))
+        self.rowcount = 1
+
+    async def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    async def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class FakeConn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.calls = []
+
+    def cursor(self, *args):
+        return self._cursor
+
+    async def begin(self):
+        self.calls.append("begin")
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        conn = self.conn
+
+        class _Acquire:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+@pytest.fixture
+def use_pool(monkeypatch):
+    def install(conn):
+        async def get_pool():
+            return FakePool(conn)
+        monkeypatch.setattr(AsyncMySQLPool, "get_or_create_pool", get_pool)
+    return install
+
+
+def test_get_candidate_projects_merges_tracks(use_pool):
+    cursor = FakeCursor(rows=[
+        (1, "A", "in_progress", "AI", "Interest"),
+        (1, "A", "in_progress", "Python", "Skill"),
+        (2, "B", "completed", "Python", "Skill"),
+    ])
+    use_pool(FakeConn(cursor))
+
+    result = json.loads(asyncio.run(db_tools.get_candidate_projects.ainvoke({"interest_ids": [3], "skill_ids": [4, 5]})))
+
+    assert [p["id"] for p in result] == [1, 2]
+    assert result[0]["matched_tags"] == ["AI(Interest)", "Python(Skill)"]
+    (sql, params), = cursor.executed
+    assert "UNION ALL" in sql
+    assert params == (3, 4, 5)
+
+
+def test_get_candidate_projects_without_ids_skips_db(use_pool):
+    cursor = FakeCursor()
+    use_pool(FakeConn(cursor))
+    assert asyncio.run(db_tools.get_candidate_projects.ainvoke({"interest_ids": [], "skill_ids": []})) == "[]"
+    assert cursor.executed == []
+
+
+def test_save_profile_commits_both_tag_sets(use_pool):
+    conn = FakeConn(FakeCursor(rows=[(7,)]))
+    use_pool(conn)
+    result = json.loads(asyncio.run(db_tools.save_profile_to_db.ainvoke({"student_id": 7, "interest_ids": [1], "skill_ids": [2]})))
+    assert result["status"] == "success"
+    assert conn.calls == ["begin", "commit"]
+
+
+def test_save_profile_rolls_back_on_error(use_pool):
+    conn = FakeConn(FakeCursor(rows=[(7,)], fail_on="tag2_stu_match"))
+    use_pool(conn)
+    result = json.loads(asyncio.run(db_tools.save_profile_to_db.ainvoke({"student_id": 7, "interest_ids": [1], "skill_ids": [2]})))
+    assert result["status"] == "failed"
+    assert conn.calls == ["begin", "rollback"]
+
+
+def test_async_pool_is_rebound_per_event_loop(monkeypatch):
+    created = []
+
+    class Pool:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+        async def wait_closed(self):
+            pass
+
+    async def create_pool(**kwargs):
+        created.append(Pool())
+        return created[-1]
+
+    monkeypatch.setattr(aiomysql, "create_pool", create_pool)
+    monkeypatch.setattr(AsyncMySQLPool, "_pool", None)
+    monkeypatch.setattr(AsyncMySQLPool, "_loop", None)
+
+    async def use(close):
+        first = await AsyncMySQLPool.get_or_create_pool()
+        assert await AsyncMySQLPool.get_or_create_pool() is first
+        if close:
+            await AsyncMySQLPool.close_pool()
+        return first
+
+    first = asyncio.run(use(close=True))
+    second = asyncio.run(use(close=True))
+    assert first is not second
+    assert first.closed and second.closed
+
+    # A pool left open on a still-running loop is closed there when another loop takes over
+    other_loop = asyncio.new_event_loop()
+    try:
+        stale = other_loop.run_until_complete(AsyncMySQLPool.get_or_create_pool())
+        asyncio.run(use(close=True))
+        other_loop.run_until_complete(asyncio.sleep(0))
+        assert stale.closed
+    finally:
+        other_loop.close()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("langchain_core")
+
+from tools import search_tools
+from tools.search_tools import extract_keywords_fast
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Python, Django, 机器学习", ["Python", "Django", "机器学习"]),
+    ("React、Vue、TypeScript", ["React", "Vue", "TypeScript"]),
+    ("机器学习 深度学习 计算机视觉 自然语言处理", ["机器学习", "深度学习", "计算机视觉", "自然语言处理"]),
+    ("C++; C#; Node.js", ["C++", "C#", "Node.js"]),
+    ("Python, Django, and, SQL", ["Python", "Django", "SQL"]),  # Stopwords dropped
+    ("Python, python, Django, SQL", ["Python", "Django", "SQL"]),  # Case-insensitive dedupe
+    ("C++, C#, Node.js, Go, Rust, Java", ["C++", "C#", "Node.js", "Go", "Rust"]),  # At most 5
+])
+def test_list_style_input_is_split_without_llm(text, expected):
+    assert extract_keywords_fast(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "I want a project about machine learning with python and big data",  # Prose: too many items
+    "我想找一个关于机器学习的项目",  # CJK clause longer than a term
+    "Python3的后端, Django",  # Mixed-script item
+    "Python, Django",  # Fewer than 3 keywords
+    "Python, and, the",  # Fewer than 3 after stopwords
+    "",
+])
+def test_prose_falls_back_to_llm(text):
+    assert extract_keywords_fast(text) is None
+
+
+def test_tool_uses_fast_path_before_llm(monkeypatch):
+    def no_llm(user_input):
+        raise AssertionError("LLM called for list-style input")
+
+    monkeypatch.setattr(search_tools, "_extract_keywords_cached", no_llm)
+    assert search_tools.extract_keywords.invoke("Python, Django, SQL") == ["Python", "Django", "SQL"]
+
+
+def test_tool_falls_back_to_input_when_llm_fails(monkeypatch):
+    def failing_llm(user_input):
+        raise RuntimeError("no API key")
+
+    monkeypatch.setattr(search_tools, "_extract_keywords_cached", failing_llm)
+    text = "I want a project about machine learning with python and big data"
+    assert search_tools.extract_keywords.invoke(text) == [text]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
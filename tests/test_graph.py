@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 
 # Add project root to sys.path
 # Since test_graph.py is in langchain-v2.0/tests, dirname(dirname) gets us to langchain-v2.0
@@ -8,7 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from graph.student_workflow import app
 
-def test_workflow():
+async def test_workflow():
     print("Initializing LangGraph Workflow...")
     
     test_input = "我熟悉Python编程，并且对深度学习感兴趣，想找相关的项目。"
@@ -26,7 +27,7 @@ def test_workflow():
     print("Running Workflow...\n")
     
     # Run the graph
-    for event in app.stream(initial_state):
+    async for event in app.astream(initial_state):
         for node_name, state_update in event.items():
             print(f"--- Node: {node_name} ---")
             if "messages" in state_update:
@@ -34,4 +35,4 @@ def test_workflow():
             print("\n")
 
 if __name__ == "__main__":
-    test_workflow()
+    asyncio.run(test_workflow())
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+langchain_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(langchain_root)
+sys.path.append(os.path.join(langchain_root, "scripts"))
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("pymilvus")
+
+from vectorize_tags import load_csv_tags
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "tags.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_interest_tags(tmp_path):
+    path = _write(tmp_path, "id,interest\n1,人工智能-机器学习\n2, 区块链 \n")
+
+    docs = load_csv_tags(path, "tag1")
+
+    assert [d.page_content for d in docs] == ["人工智能-机器学习", "区块链"]
+    assert docs[0].metadata == {"id": 1, "tag_name": "人工智能-机器学习", "value": "人工智能-机器学习", "type": "interest"}
+
+
+def test_skill_tags_with_quoted_and_comma_fields(tmp_path):
+    path = _write(
+        tmp_path,
+        'id,skill,category,subcategory,specialty\n'
+        '7,"互联网-后端开发, Java",互联网,"后端, 服务端","Java, Spring"\n'
+        '8,"设计-""UI""设计",设计,视觉,\n',
+    )
+
+    docs = load_csv_tags(path, "tag2")
+
+    assert docs[0].page_content == "互联网-后端开发, Java"
+    assert docs[0].metadata == {
+        "id": 7,
+        "tag_name": "Java, Spring",
+        "post": "互联网-后端开发, Java",
+        "category": "互联网",
+        "subcategory": "后端, 服务端",
+        "specialty": "Java, Spring",
+        "type": "skill",
+    }
+    # Escaped quotes, and tag_name falls back to the skill when specialty is empty
+    assert docs[1].page_content == '设计-"UI"设计'
+    assert docs[1].metadata["tag_name"] == '设计-"UI"设计'
+
+
+def test_header_order_and_missing_columns(tmp_path):
+    path = _write(tmp_path, "skill,id\nPython,3\n")
+
+    docs = load_csv_tags(path, "tag2")
+
+    assert docs[0].metadata["id"] == 3
+    assert docs[0].metadata["category"] == ""
+
+
+def test_bad_and_empty_rows_are_skipped(tmp_path):
+    path = _write(tmp_path, "id,interest\nx,非法ID\n4,\n5,物联网\n")
+
+    docs = load_csv_tags(path, "tag1")
+
+    assert [d.metadata["id"] for d in docs] == [5]
+
+
+def test_missing_or_empty_file(tmp_path):
+    assert load_csv_tags(str(tmp_path / "missing.csv"), "tag1") == []
+    assert load_csv_tags(_write(tmp_path, ""), "tag1") == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -1,6 +1,7 @@
 
 import os
 import sys
+import asyncio
 import django
 from django.conf import settings
 
@@ -56,11 +57,29 @@ from user.models import OrganizationUser
 from organization.models import Organization
 from project.models import Requirement
 from graph.publisher_agent import publisher_app
+from core.db import AsyncMySQLPool
 from langchain_core.messages import HumanMessage, AIMessage
 
 User = get_user_model()
 
-from asgiref.sync import async_to_sync
+async def _converse(state):
+    """Both rounds on one event loop: the MySQL pool and Milvus clients are bound to it."""
+    # Run 1
+    print("\n--- Round 1 ---")
+    result = await publisher_app.ainvoke(state)
+    last_msg = result['messages'][-1]
+    print(f"Agent: {last_msg.content}")
+    
+    # 2. User provides details
+    print("\n--- Round 2 ---")
+    user_input = "项目标题是'Python电商后台'，简介是'基于Django开发'，详细描述是'我们需要一个支持高并发的电商后台，使用Django DRF框架，需要Redis缓存和MySQL数据库。'"
+    new_messages = result['messages'] + [HumanMessage(content=user_input)]
+    state['messages'] = new_messages
+    
+    try:
+        return await publisher_app.ainvoke(state), new_messages
+    finally:
+        await AsyncMySQLPool.close_pool()  # Pool is bound to this loop
 
 def test_publisher_agent():
     print("Setting up test data...")
@@ -100,19 +119,7 @@ def test_publisher_agent():
         "is_complete": False
     }
     
-    # Run 1
-    print("\n--- Round 1 ---")
-    result = async_to_sync(publisher_app.ainvoke)(state)
-    last_msg = result['messages'][-1]
-    print(f"Agent: {last_msg.content}")
-    
-    # 2. User provides details
-    print("\n--- Round 2 ---")
-    user_input = "项目标题是'Python电商后台'，简介是'基于Django开发'，详细描述是'我们需要一个支持高并发的电商后台，使用Django DRF框架，需要Redis缓存和MySQL数据库。'"
-    new_messages = result['messages'] + [HumanMessage(content=user_input)]
-    state['messages'] = new_messages
-    
-    result = async_to_sync(publisher_app.ainvoke)(state)
+    result, new_messages = asyncio.run(_converse(state))
     
     # Check if tool was called (save_draft)
     # The result should contain the tool call message and the tool output message if the graph executed the tool.
@@ -126,10 +133,10 @@ def test_publisher_agent():
             print(f"Agent/Tool Output: {msg.content}")
             
     # Check DB
-    reqs = Requirement.objects.filter(title="Python电商后台", organization=org)
-    if reqs.exists():
-        print(f"\nSUCCESS: Requirement created! ID: {reqs.first().id}")
-        req = reqs.first()
+    # One SELECT of just the printed columns (exists() + first() x2 issued three)
+    req = Requirement.objects.only("id", "status", "description").filter(title="Python电商后台", organization=org).first()
+    if req:
+        print(f"\nSUCCESS: Requirement created! ID: {req.id}")
         print(f"Status: {req.status}")
         print(f"Description: {req.description}")
     else:
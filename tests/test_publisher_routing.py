@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+langchain_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(langchain_root)
+# Django apps (project, user, ...) live in the parent project
+sys.path.append(os.getenv("DJANGO_PROJECT_ROOT") or os.path.dirname(langchain_root))
+
+django = pytest.importorskip("django")
+from django.conf import settings
+from unittest.mock import patch
+
+# Same minimal configuration as test_async_import: the graph imports the real models
+if not settings.configured:
+    settings.configure(
+        DEBUG=True,
+        SECRET_KEY='test',
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'user',
+            'organization',
+            'project',
+            'projectscore',
+            'studentproject',
+            'authentication',
+            'notification',
+        ],
+        MIGRATION_MODULES={'audit': None, 'admin_tool': None},
+        USE_TZ=True,
+        AUTH_USER_MODEL='user.User',
+    )
+    try:
+        django.setup()
+    except ImportError as e:
+        pytest.skip(f"Django project not available: {e}", allow_module_level=True)
+
+with patch('core.django_setup.setup_django'):
+    from graph.publisher_main_agent import _route_by_keywords
+
+
+@pytest.mark.parametrize("message", [
+    "I want to publish a new project",
+    "Can you help me post a requirement?",  # Publish wins over the chat trigger
+    "save it as a Draft",
+    "我要发布一个Python后端项目",
+    "帮我创建需求",
+    "我们想招募两名前端同学",
+])
+def test_publish_triggers(message):
+    assert _route_by_keywords(message) == "publisher_flow"
+
+
+@pytest.mark.parametrize("message", ["hi", "Hello!", "help", "你好", "谢谢"])
+def test_short_greetings_go_to_chat(message):
+    assert _route_by_keywords(message) == "chat_node"
+
+
+@pytest.mark.parametrize("message", [
+    "hello, could you explain how the matching between projects and students works?",  # Long: not a greeting
+    "postgres replication questions",  # ASCII triggers match whole tokens only
+    "highlight the differences",
+    "这个平台能做什么",
+    "",
+])
+def test_no_trigger_falls_through_to_llm(message):
+    assert _route_by_keywords(message) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,82 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("langgraph")
+pytest.importorskip("datasketch")
+
+from graph.student_workflow import rerank_node
+
+DESCRIPTION = "基于深度学习的疲劳驾驶智能识别系统，使用端云协同算力完成实时检测与预警"
+
+
+def _project(pid, title, description=DESCRIPTION, score=1.0):
+    return {"id": pid, "title": title, "description": description, "score": score}
+
+
+def _rerank(tag=(), semantic=(), keyword=()):
+    state = {"tag_candidates": list(tag), "semantic_candidates": list(semantic), "keyword_candidates": list(keyword)}
+    return asyncio.run(rerank_node(state))["ranked_projects"]
+
+
+def test_near_duplicates_collapse_to_best_scored():
+    original = _project(1, "疲劳驾驶识别", score=0.5)
+    # Same text up to case, whitespace and punctuation
+    repost = _project(2, "疲劳驾驶识别!", description=DESCRIPTION.replace("，", " ") + "。", score=0.9)
+
+    ranked = _rerank(semantic=[original, repost])
+
+    assert [p["id"] for p in ranked] == [2]
+
+
+def test_distinct_projects_are_kept_in_score_order():
+    a = _project(1, "疲劳驾驶识别", score=0.3)
+    b = _project(2, "电商后台", description="使用Django DRF开发支持高并发的电商后台，包含Redis缓存与MySQL数据库", score=0.9)
+
+    ranked = _rerank(semantic=[a, b])
+
+    assert [p["id"] for p in ranked] == [2, 1]
+
+
+def test_tracks_are_merged_with_weights():
+    tag_only = _project(1, "标签项目", description="区块链供应链金融平台", score=1.0)
+    keyword_only = _project(2, "关键词项目", description="移动端健康管理小程序", score=1.0)
+
+    ranked = _rerank(tag=[tag_only], keyword=[keyword_only])
+
+    assert [p["id"] for p in ranked] == [1, 2]
+    assert ranked[0]["final_score"] == pytest.approx(0.4)
+    assert ranked[1]["final_score"] == pytest.approx(0.2)
+
+
+def test_same_project_from_several_tracks_is_one_row():
+    tag_hit = _project(1, "疲劳驾驶识别", score=1.0)
+    semantic_hit = _project(1, "疲劳驾驶识别", score=0.5)
+
+    ranked = _rerank(tag=[tag_hit], semantic=[semantic_hit])
+
+    assert len(ranked) == 1
+    assert ranked[0]["final_score"] == pytest.approx(0.4 + 0.2)
+
+
+def test_untitled_rows_are_dropped():
+    ranked = _rerank(semantic=[{"id": 1, "description": DESCRIPTION, "score": 1.0}])
+    assert ranked == []
+
+
+def test_at_most_15_projects():
+    projects = [
+        _project(i, f"项目{i}", description=f"第{i}号项目：" + "".join(chr(0x4e00 + i * 37 + j) for j in range(30)), score=i / 20)
+        for i in range(20)
+    ]
+    ranked = _rerank(semantic=projects)
+    assert len(ranked) == 15
+    assert ranked[0]["id"] == 19
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
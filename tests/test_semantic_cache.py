@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.semantic_cache import SemanticCache
+
+
+def _at_cosine(cos: float) -> list:
+    """Unit vector in 2-D whose cosine similarity with [1, 0] is cos."""
+    return [cos, float(np.sqrt(1 - cos * cos))]
+
+
+def test_hit_at_threshold_and_miss_below():
+    cache = SemanticCache(max_size=4)
+    cache.put([1.0, 0.0], "value")
+
+    assert cache.check(_at_cosine(0.95), 0.95) == "value"
+    assert cache.check(_at_cosine(0.94), 0.95) is None
+
+
+def test_embeddings_are_normalized():
+    cache = SemanticCache(max_size=4)
+    cache.put([10.0, 0.0], "value")
+    assert cache.check([0.5, 0.0], 0.99) == "value"
+
+
+def test_zero_and_mismatched_embeddings_are_ignored():
+    cache = SemanticCache(max_size=4)
+    cache.put([0.0, 0.0], "zero")
+    assert len(cache) == 0
+
+    cache.put([1.0, 0.0], "value")
+    assert cache.check([0.0, 0.0], 0.5) is None
+    assert cache.check([1.0, 0.0, 0.0], 0.5) is None
+
+
+def test_best_match_wins():
+    cache = SemanticCache(max_size=4)
+    cache.put(_at_cosine(0.96), "close")
+    cache.put([1.0, 0.0], "exact")
+    assert cache.check([1.0, 0.0], 0.9) == "exact"
+
+
+def test_entries_expire_after_ttl():
+    cache = SemanticCache(max_size=4, ttl_seconds=60)
+    cache.put([1.0, 0.0], "short", ttl=0.01)
+    cache.put([0.0, 1.0], "long")
+    time.sleep(0.02)
+
+    assert cache.check([1.0, 0.0], 0.99) is None
+    assert cache.check([0.0, 1.0], 0.99) == "long"
+
+
+def test_lru_eviction_order():
+    cache = SemanticCache(max_size=2)
+    cache.put([1.0, 0.0], "a")
+    cache.put([0.0, 1.0], "b")
+    assert cache.check([1.0, 0.0], 0.99) == "a"  # "a" is now most recently used
+
+    cache.put([-1.0, 0.0], "c")  # Evicts "b"
+
+    assert cache.check([0.0, 1.0], 0.99) is None
+    assert cache.check([1.0, 0.0], 0.99) == "a"
+    assert cache.check([-1.0, 0.0], 0.99) == "c"
+    assert len(cache) == 2
+
+
+def test_expired_entries_are_evicted_before_live_ones():
+    cache = SemanticCache(max_size=2, ttl_seconds=60)
+    cache.put([1.0, 0.0], "stale", ttl=0.01)
+    cache.put([0.0, 1.0], "live")
+    cache.check([1.0, 0.0], 0.99)  # Stale entry would be most recently used, were it alive
+    time.sleep(0.02)
+
+    cache.put([-1.0, 0.0], "new")
+
+    assert cache.check([0.0, 1.0], 0.99) == "live"
+    assert cache.check([-1.0, 0.0], 0.99) == "new"
+
+
+def test_values_are_copied():
+    cache = SemanticCache(max_size=2)
+    value = {"ids": [1, 2]}
+    cache.put([1.0, 0.0], value)
+    value["ids"].append(3)
+
+    hit = cache.check([1.0, 0.0], 0.99)
+    assert hit == {"ids": [1, 2]}
+    hit["ids"].append(4)
+    assert cache.check([1.0, 0.0], 0.99) == {"ids": [1, 2]}
+
+
+def test_clear():
+    cache = SemanticCache(max_size=2)
+    cache.put([1.0, 0.0], "a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.check([1.0, 0.0], 0.5) is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
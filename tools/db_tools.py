@@ -5,20 +5,27 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from langchain_core.tools import tool
-from core.config import Config
+from core.db import AsyncMySQLPool, in_placeholders
 
 @tool
-def save_profile_to_db(student_id: int, interest_ids: list[int], skill_ids: list[int]) -> str:
+async def save_profile_to_db(student_id: int, interest_ids: list[int], skill_ids: list[int]) -> str:
     """Save the user's profile (tags) to the database."""
-    conn = Config.get_db_connection()
-    try:
-        cursor = conn.cursor()
+    pool = await AsyncMySQLPool.get_or_create_pool()
+    async with pool.acquire() as conn:
+        try:
+            return await _save_profile(conn, student_id, interest_ids, skill_ids)
+        except Exception as e:
+            await conn.rollback()
+            return json.dumps({"status": "failed", "message": str(e)})
+
+async def _save_profile(conn, student_id: int, interest_ids: list[int], skill_ids: list[int]) -> str:
+    async with conn.cursor() as cursor:
         # Verify student exists
-        cursor.execute("SELECT id FROM student WHERE id = %s", (student_id,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT id FROM student WHERE id = %s", (student_id,))
+        if not await cursor.fetchone():
             # Fallback for demo
-            cursor.execute("SELECT id FROM student LIMIT 1")
-            res = cursor.fetchone()
+            await cursor.execute("SELECT id FROM student LIMIT 1")
+            res = await cursor.fetchone()
             if res:
                 student_id = res[0]
             else:
@@ -27,91 +34,85 @@ def save_profile_to_db(student_id: int, interest_ids: list[int], skill_ids: list
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         inserted_count = 0
 
+        await conn.begin()  # Both tag sets are committed together
+
         # Save Interests
+        # INSERT ... SELECT drops unknown tag ids server-side: one round trip instead of SELECT + insert
         if interest_ids:
-            format_strings = ','.join(['%s'] * len(interest_ids))
-            cursor.execute(f"SELECT id FROM tag_1 WHERE id IN ({format_strings})", tuple(interest_ids))
-            valid_ids = [row[0] for row in cursor.fetchall()]
-            if valid_ids:
-                data = [(student_id, tid, now) for tid in valid_ids]
-                cursor.executemany(
-                    "INSERT INTO tag1_stu_match (student_id, tag1_id, created_at) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE created_at = VALUES(created_at)",
-                    data
-                )
-                inserted_count += cursor.rowcount
+            format_strings = in_placeholders(len(interest_ids))
+            await cursor.execute(
+                f"""
+                INSERT INTO tag1_stu_match (student_id, tag1_id, created_at)
+                SELECT %s, id, %s FROM tag_1 WHERE id IN ({format_strings})
+                ON DUPLICATE KEY UPDATE created_at = VALUES(created_at)
+                """,
+                (student_id, now, *interest_ids)
+            )
+            inserted_count += cursor.rowcount
 
         # Save Skills
         if skill_ids:
-            format_strings = ','.join(['%s'] * len(skill_ids))
-            cursor.execute(f"SELECT id FROM tag_2 WHERE id IN ({format_strings})", tuple(skill_ids))
-            valid_ids = [row[0] for row in cursor.fetchall()]
-            if valid_ids:
-                data = [(student_id, tid, now) for tid in valid_ids]
-                cursor.executemany(
-                    "INSERT INTO tag2_stu_match (student_id, tag2_id, created_at) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE created_at = VALUES(created_at)",
-                    data
-                )
-                inserted_count += cursor.rowcount
+            format_strings = in_placeholders(len(skill_ids))
+            await cursor.execute(
+                f"""
+                INSERT INTO tag2_stu_match (student_id, tag2_id, created_at)
+                SELECT %s, id, %s FROM tag_2 WHERE id IN ({format_strings})
+                ON DUPLICATE KEY UPDATE created_at = VALUES(created_at)
+                """,
+                (student_id, now, *skill_ids)
+            )
+            inserted_count += cursor.rowcount
 
-        conn.commit()
+        await conn.commit()
         return json.dumps({"status": "success", "message": f"Updated {inserted_count} records"})
-    except Exception as e:
-        return json.dumps({"status": "failed", "message": str(e)})
-    finally:
-        conn.close()
 
 @tool
-def get_candidate_projects(interest_ids: list[int], skill_ids: list[int]) -> str:
+async def get_candidate_projects(interest_ids: list[int], skill_ids: list[int]) -> str:
     """Fetch potential projects from database based on tag IDs."""
     if not interest_ids and not skill_ids:
         return "[]"
         
-    conn = Config.get_db_connection()
     projects = {}
     try:
-        cursor = conn.cursor()
-        
-        # Projects matching Interests
+        pool = await AsyncMySQLPool.get_or_create_pool()
+        # Projects matching Interests and Skills in one round trip.
+        # Each branch keeps its own LIMIT 20, as when they were separate queries.
+        branches, params = [], []
         if interest_ids:
-            format_strings = ','.join(['%s'] * len(interest_ids))
-            sql = f"""
-            SELECT DISTINCT pr.id, pr.title, pr.status, prt.tag1_id, t1.value
+            format_strings = in_placeholders(len(interest_ids))
+            branches.append(f"""
+            (SELECT DISTINCT pr.id, pr.title, pr.status, t1.value AS tag, 'Interest' AS src
             FROM project_requirement pr
             JOIN project_requirement_tag1 prt ON pr.id = prt.requirement_id
             JOIN tag_1 t1 ON prt.tag1_id = t1.id
             WHERE prt.tag1_id IN ({format_strings}) 
             AND pr.status IN ('in_progress', 'completed', 'paused')
-            LIMIT 20
-            """
-            cursor.execute(sql, tuple(interest_ids))
-            for r in cursor.fetchall():
-                pid = r[0]
-                if pid not in projects:
-                    projects[pid] = {"id": pid, "title": r[1], "status": r[2], "matched_tags": []}
-                projects[pid]["matched_tags"].append(f"{r[4]}(Interest)")
+            LIMIT 20)
+            """)
+            params.extend(interest_ids)
 
-        # Projects matching Skills
         if skill_ids:
-            format_strings = ','.join(['%s'] * len(skill_ids))
-            sql = f"""
-            SELECT DISTINCT pr.id, pr.title, pr.status, prt.tag2_id, t2.post
+            format_strings = in_placeholders(len(skill_ids))
+            branches.append(f"""
+            (SELECT DISTINCT pr.id, pr.title, pr.status, t2.post AS tag, 'Skill' AS src
             FROM project_requirement pr
             JOIN project_requirement_tag2 prt ON pr.id = prt.requirement_id
             JOIN tag_2 t2 ON prt.tag2_id = t2.id
             WHERE prt.tag2_id IN ({format_strings}) 
             AND pr.status IN ('in_progress', 'completed', 'paused')
-            LIMIT 20
-            """
-            cursor.execute(sql, tuple(skill_ids))
-            for r in cursor.fetchall():
-                pid = r[0]
-                if pid not in projects:
-                    projects[pid] = {"id": pid, "title": r[1], "status": r[2], "matched_tags": []}
-                projects[pid]["matched_tags"].append(f"{r[4]}(Skill)")
+            LIMIT 20)
+            """)
+            params.extend(skill_ids)
+
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute(" UNION ALL ".join(branches), tuple(params))
+            rows = await cursor.fetchall()
+        for pid, title, status, tag, src in rows:
+            if pid not in projects:
+                projects[pid] = {"id": pid, "title": title, "status": status, "matched_tags": []}
+            projects[pid]["matched_tags"].append(f"{tag}({src})")
                 
     except Exception as e:
         print(f"Error fetching projects: {e}")
-    finally:
-        conn.close()
         
     return json.dumps(list(projects.values()), ensure_ascii=False)
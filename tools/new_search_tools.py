@@ -1,87 +1,80 @@
 import sys
 import os
 import json
+import asyncio
+import aiomysql
 import pymysql
 from langchain_core.tools import tool
 from core.config import Config
+from core.db import AsyncMySQLPool, in_placeholders
+from core.semantic_cache import SemanticCache
+from tools.search_tools import embed_for_cache
 
 # Ensure parent directory is in path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# --- Semantic Cache ---
+# Hydrated semantic-track results by query embedding: a paraphrased query skips the
+# Milvus search and the MySQL lookup. Ingestion runs out of process, so the TTL
+# bounds how stale a cached project list can get.
+SEMANTIC_RESULTS_CACHE = SemanticCache(max_size=1024, ttl_seconds=300)
+SEMANTIC_RESULTS_CACHE_THRESHOLD = 0.95
+
+SEMANTIC_TOP_K = 20
+SEMANTIC_MAX_K = 64  # Upper bound for the widening search (20 -> 40 -> 64)
+
 @tool
 def search_projects_by_tags(interest_ids: list[int], skill_ids: list[int]) -> list[dict]:
     """
     Track 1: Retrieve candidate projects based on Tag IDs (Precise Match).
     Returns list of dictionaries with scores.
     """
+    # Score = 1 point per matched interest (Tag1) or skill (Tag2), counted by MySQL:
+    # matches from both link tables are grouped per project and only the top 20 are returned.
+    branches, params = [], []
+    if interest_ids:
+        # Assuming table is project_requirement_tag1 and fields are requirement_id, tag1_id
+        branches.append(f"SELECT requirement_id FROM project_requirement_tag1 WHERE tag1_id IN ({in_placeholders(len(interest_ids))})")
+        params.extend(interest_ids)
+    if skill_ids:
+        branches.append(f"SELECT requirement_id FROM project_requirement_tag2 WHERE tag2_id IN ({in_placeholders(len(skill_ids))})")
+        params.extend(skill_ids)
+    if not branches:
+        return []
+
     conn = Config.get_db_connection()
-    candidates = {} # {project_id: {data, score}}
+    # Standard pymysql connection, pass cursor class as argument
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    candidates = []
     
     try:
-        # Standard pymysql connection, pass cursor class as argument
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        
-        # 1. Search Interest Matches (Tag1)
-        if interest_ids:
-            format_strings = ','.join(['%s'] * len(interest_ids))
-            # Assuming table is project_requirement_tag1 and fields are requirement_id, tag1_id
-            query = f"""
-                SELECT r.id, r.title, r.status, r.description 
-                FROM project_requirement r
-                JOIN project_requirement_tag1 rt ON r.id = rt.requirement_id
-                WHERE rt.tag1_id IN ({format_strings})
-                AND r.status IN ('under_review', 'in_progress', 'completed') 
-            """
-            
-            cursor.execute(query, tuple(interest_ids))
-            rows = cursor.fetchall()
-            for row in rows:
-                pid = row['id']
-                if pid not in candidates:
-                    candidates[pid] = {
-                        "id": pid,
-                        "title": row['title'],
-                        "status": row['status'],
-                        "description": row['description'],
-                        "score": 0.0,
-                        "match_type": "tag"
-                    }
-                candidates[pid]["score"] += 1.0 # 1 point per interest match
-
-        # 2. Search Skill Matches (Tag2)
-        if skill_ids:
-            format_strings = ','.join(['%s'] * len(skill_ids))
-            query = f"""
-                SELECT r.id, r.title, r.status, r.description
-                FROM project_requirement r
-                JOIN project_requirement_tag2 rt ON r.id = rt.requirement_id
-                WHERE rt.tag2_id IN ({format_strings})
-                AND r.status IN ('under_review', 'in_progress', 'completed')
-            """
-            cursor.execute(query, tuple(skill_ids))
-            rows = cursor.fetchall()
-            for row in rows:
-                pid = row['id']
-                if pid not in candidates:
-                    candidates[pid] = {
-                        "id": pid,
-                        "title": row['title'],
-                        "status": row['status'],
-                        "description": row['description'],
-                        "score": 0.0,
-                        "match_type": "tag"
-                    }
-                candidates[pid]["score"] += 1.0 # 1 point per skill match
+        query = f"""
+            SELECT r.id, r.title, r.status, r.description, COUNT(*) AS score
+            FROM project_requirement r
+            JOIN ({" UNION ALL ".join(branches)}) rt ON r.id = rt.requirement_id
+            WHERE r.status IN ('under_review', 'in_progress', 'completed')
+            GROUP BY r.id
+            ORDER BY score DESC, r.id
+            LIMIT 20
+        """
+        cursor.execute(query, tuple(params))
+        for row in cursor:
+            candidates.append({
+                "id": row['id'],
+                "title": row['title'],
+                "status": row['status'],
+                "description": row['description'],
+                "score": float(row['score']),
+                "match_type": "tag"
+            })
                 
     except Exception as e:
         print(f"Error in tag search: {e}")
     finally:
-        if conn:
-            conn.close()
+        cursor.close()
+        conn.close()  # Back to the pool
             
-    # Sort by score
-    sorted_candidates = sorted(candidates.values(), key=lambda x: x['score'], reverse=True)
-    return sorted_candidates[:20]
+    return candidates
 
 @tool
 async def search_projects_semantic(query: str) -> list[dict]:
@@ -93,51 +86,71 @@ async def search_projects_semantic(query: str) -> list[dict]:
     results = []
     milvus_matches = {} # {id: {score, doc}}
     
+    query_emb = await embed_for_cache(query)
+    if query_emb:
+        cached = SEMANTIC_RESULTS_CACHE.check(query_emb, SEMANTIC_RESULTS_CACHE_THRESHOLD)
+        if cached is not None:
+            return [dict(p) for p in cached]
+    
     try:
-        # Search
-        docs = await store.asimilarity_search_with_score(query, k=20)
-        
-        project_ids = []
-        for doc, score in docs:
-            meta = doc.metadata
-            pid = meta.get("project_id") or meta.get("id")
-            if pid:
-                project_ids.append(pid)
-                milvus_matches[pid] = {"score": score, "content": doc.page_content}
-        
-        if not project_ids:
-            return []
+        # Adaptive k: some hits are dropped by the status filter, so widen the search
+        # until SEMANTIC_TOP_K projects survive (or the collection/ef bound is reached).
+        pool = await AsyncMySQLPool.get_or_create_pool()
+        rows_by_id = {}
+        k = SEMANTIC_TOP_K
+        while True:
+            # Search (reusing the cache-key embedding instead of embedding the query again)
+            if query_emb:
+                docs = await store.asimilarity_search_with_score_by_vector(query_emb, k=k)
+            else:
+                docs = await store.asimilarity_search_with_score(query, k=k)
             
-        # Fetch details from DB to fill title, status, etc.
-        conn = Config.get_db_connection()
-        try:
-            # Standard pymysql connection, pass cursor class as argument
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            format_strings = ','.join(['%s'] * len(project_ids))
-            sql = f"""
-                SELECT id, title, status, description 
-                FROM project_requirement 
-                WHERE id IN ({format_strings})
-                AND status IN ('under_review', 'in_progress', 'completed')
-            """
-            cursor.execute(sql, tuple(project_ids))
-            rows = cursor.fetchall()
+            # Hits come back best-first and earlier ones repeat, so only new ids need hydrating
+            project_ids = []
+            for doc, score in docs:
+                meta = doc.metadata
+                pid = meta.get("project_id") or meta.get("id")
+                if pid and pid not in milvus_matches:
+                    project_ids.append(pid)
+                    milvus_matches[pid] = {"score": Config.milvus_similarity(store, score), "content": doc.page_content}
             
-            for row in rows:
-                pid = row['id']
-                if pid in milvus_matches:
-                    match_info = milvus_matches[pid]
-                    results.append({
-                        "id": pid,
-                        "title": row['title'],
-                        "status": row['status'],
-                        "description": row['description'], # Use clean DB description
-                        "score": match_info['score'],
-                        "match_type": "semantic"
-                    })
-        finally:
-            if conn:
-                conn.close()
+            if project_ids:
+                # Fetch details from DB to fill title, status, etc.
+                # Awaited on the async pool: a blocking pymysql call here would stall the event loop
+                format_strings = in_placeholders(len(project_ids))
+                sql = f"""
+                    SELECT id, title, status, description 
+                    FROM project_requirement 
+                    WHERE id IN ({format_strings})
+                    AND status IN ('under_review', 'in_progress', 'completed')
+                """
+                async with pool.acquire() as conn, conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(sql, tuple(project_ids))
+                    for row in await cursor.fetchall():
+                        rows_by_id[row['id']] = row
+            
+            if len(rows_by_id) >= SEMANTIC_TOP_K or len(docs) < k or k >= SEMANTIC_MAX_K:
+                break
+            k = min(k * 2, SEMANTIC_MAX_K)
+            
+        # Milvus rank order, first SEMANTIC_TOP_K that passed the status filter
+        for pid, match_info in milvus_matches.items():
+            row = rows_by_id.get(pid)
+            if row is None:
+                continue
+            results.append({
+                "id": pid,
+                "title": row['title'],
+                "status": row['status'],
+                "description": row['description'], # Use clean DB description
+                "score": match_info['score'],
+                "match_type": "semantic"
+            })
+            if len(results) == SEMANTIC_TOP_K:
+                break
+
+        if query_emb and results:
+            SEMANTIC_RESULTS_CACHE.put(query_emb, [dict(p) for p in results])
 
     except Exception as e:
         print(f"Error in semantic search: {e}")
@@ -150,73 +163,109 @@ def search_projects_fulltext(keywords: list[str]) -> list[dict]:
     Track 3: Retrieve candidate projects based on Fulltext Search (Keyword Match).
     Uses MySQL Fulltext Index.
     """
+    # Case-insensitive dedupe (the LIKE/MATCH collation ignores case anyway), so a
+    # keyword repeated as "Python"/"python" is neither matched nor counted twice
+    keywords = list({k.strip().casefold(): k.strip() for k in keywords if k.strip()}.values())
     if not keywords:
         return []
         
     conn = Config.get_db_connection()
+    # Standard pymysql connection, pass cursor class as argument
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
     results = []
     try:
-        # Standard pymysql connection, pass cursor class as argument
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
         # Prepare boolean query
         # e.g. "+keyword1 +keyword2" or just "keyword1 keyword2"
         search_query = " ".join(keywords) 
         
+        # LIKE fallback for when Fulltext finds nothing (e.g. CJK issues):
+        # title LIKE %k1% OR description LIKE %k1% ...
+        # Score = number of keywords a project contains, counted by MySQL (each
+        # condition is 0/1) so the best matches fill the LIMIT instead of arbitrary rows.
+        # A NULL description makes a non-matching condition NULL (not 0), which would
+        # null the whole sum: COALESCE each term.
+        conditions = []
+        like_params = []
+        for k in keywords:
+            conditions.append("(title LIKE %s OR description LIKE %s)")
+            like_params.extend([f"%{k}%", f"%{k}%"])
+        
+        where_clause = " OR ".join(conditions)
+        score_expr = " + ".join(f"COALESCE({c}, 0)" for c in conditions)
+        
+        # Both in one round trip: the LIKE branch is gated by NOT EXISTS on the
+        # (uncorrelated) fulltext condition, so it only contributes when Fulltext is empty.
         # Using boolean mode for flexibility
         sql = f"""
-            SELECT id, title, status, description, 
-            MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) as score
+            (SELECT id, title, status, description, 
+            MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) as score,
+            'fulltext' as match_type
             FROM project_requirement
             WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+            AND status IN ('under_review', 'in_progress', 'completed'))
+            UNION ALL
+            (SELECT id, title, status, description, 
+            ({score_expr}) as score,
+            'like_fallback' as match_type
+            FROM project_requirement
+            WHERE ({where_clause})
             AND status IN ('under_review', 'in_progress', 'completed')
+            AND NOT EXISTS (
+                SELECT 1 FROM project_requirement
+                WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+                AND status IN ('under_review', 'in_progress', 'completed')
+            ))
             ORDER BY score DESC
             LIMIT 20
         """
-        cursor.execute(sql, (search_query, search_query))
-        rows = cursor.fetchall()
-        
-        # Fallback to LIKE if no results found with Fulltext (e.g. CJK issues)
-        if not rows and keywords:
-            # Construct LIKE query: title LIKE %k1% OR description LIKE %k1% ...
-            conditions = []
-            params = []
-            for k in keywords:
-                conditions.append("(title LIKE %s OR description LIKE %s)")
-                params.extend([f"%{k}%", f"%{k}%"])
-            
-            where_clause = " OR ".join(conditions)
-            sql_like = f"""
-                SELECT id, title, status, description, 
-                1.0 as score
-                FROM project_requirement
-                WHERE ({where_clause})
-                AND status IN ('under_review', 'in_progress', 'completed')
-                LIMIT 20
-            """
-            cursor.execute(sql_like, tuple(params))
-            rows = cursor.fetchall()
-            # Mark as LIKE match
-            for row in rows:
-                 row['match_type'] = 'like_fallback'
+        cursor.execute(sql, (search_query, search_query, *like_params, *like_params, search_query))
 
-        for row in rows:
+        # Iterate the buffered result directly rather than copying it out with fetchall()
+        for row in cursor:
             results.append({
                 "id": row['id'],
                 "title": row['title'],
                 "status": row['status'],
                 "description": row['description'],
                 "score": row['score'],
-                "match_type": row.get('match_type', 'fulltext')
+                "match_type": row['match_type']
             })
             
     except Exception as e:
         print(f"Error in fulltext search: {e}")
     finally:
-        if conn:
-            conn.close()
+        cursor.close()
+        conn.close()  # Back to the pool
             
     return results
 
+@tool
+async def search_projects_all(interest_ids: list[int], skill_ids: list[int], query: str, keywords: list[str]) -> dict:
+    """
+    Run the three recall tracks (tag, semantic, keyword) concurrently.
+    Returns {"tag": [...], "semantic": [...], "keyword": [...]}; a failed track yields [].
+    """
+    # The sync tracks run on executor threads via ainvoke, each with its own pooled
+    # connection, so latency is max(tracks) instead of their sum
+    tracks = ("tag", "semantic", "keyword")
+    results = await asyncio.gather(
+        search_projects_by_tags.ainvoke({"interest_ids": interest_ids, "skill_ids": skill_ids}),
+        search_projects_semantic.ainvoke({"query": query}),
+        search_projects_fulltext.ainvoke({"keywords": keywords}),
+        return_exceptions=True
+    )
+    recall = {}
+    for track, result in zip(tracks, results):
+        if isinstance(result, BaseException):
+            print(f"Error in {track} recall: {result}")
+            result = []
+        recall[track] = result
+    return recall
+
+def _project_id_expr(project_ids: list[int]) -> str:
+    """Milvus filter on the (scalar-indexed) project_id field; ids must already be ints."""
+    return "project_id in [" + ",".join(map(str, project_ids)) + "]"
+
 @tool
 async def retrieve_project_chunks(project_ids: list[int], query: str) -> dict:
     """
@@ -226,6 +275,7 @@ async def retrieve_project_chunks(project_ids: list[int], query: str) -> dict:
     if not project_ids:
         return {}
         
+    project_ids = [int(pid) for pid in project_ids]
     store = Config.get_milvus_store("project_raw_docs")
     # Initialize with integer keys for processing
     temp_chunks = {pid: [] for pid in project_ids}
@@ -235,7 +285,7 @@ async def retrieve_project_chunks(project_ids: list[int], query: str) -> dict:
         # So we search broadly and filter, or use filter expression if supported.
         # LangChain Milvus supports 'expr'.
         
-        expr = f"project_id in {project_ids}"
+        expr = _project_id_expr(project_ids)
         # Search
         docs = await store.asimilarity_search(query, k=50, expr=expr)
         
@@ -264,12 +314,13 @@ async def retrieve_project_summary(project_ids: list[int], query: str) -> dict:
     if not project_ids:
         return {}
         
+    project_ids = [int(pid) for pid in project_ids]
     store = Config.get_milvus_store("project_embeddings")
     # Initialize with integer keys for processing
     temp_chunks = {pid: [] for pid in project_ids}
     
     try:
-        expr = f"project_id in {project_ids}"
+        expr = _project_id_expr(project_ids)
         # Search
         docs = await store.asimilarity_search(query, k=10, expr=expr)
         
@@ -1,26 +1,131 @@
 import sys
 import os
+import asyncio
+import re
+import functools
+from collections import OrderedDict
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from typing import List, Optional
 from langchain_core.tools import tool
 from core.config import Config
+from core.db import AsyncMySQLPool, in_placeholders
+from core.semantic_cache import SemanticCache
 
-@tool
-def extract_keywords(user_input: str) -> list[str]:
-    """Extract 3-5 distinct technical keywords from user description."""
+# --- Semantic Caches ---
+# Shared by analyze_query_node and recommend_tags_logic: near-duplicate inputs
+# (paraphrases, repeated questions) reuse the keyword LLM call.
+# Tag results depend on each caller's query set, so each caller keeps its own tag
+# cache (see student_workflow / tag_recommendation) with TAGS_CACHE_THRESHOLD.
+KEYWORDS_CACHE = SemanticCache(max_size=1024, ttl_seconds=300)
+KEYWORDS_CACHE_THRESHOLD = 0.95  # Keywords drive literal recall, so require near-identical input
+TAGS_CACHE_THRESHOLD = 0.90
+
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+_query_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+
+async def embed_query(text: str) -> List[float]:
+    """
+    Query embedding, memoized per process (LRU on the stripped text).
+    One turn embeds user_input for the cache lookups, tag retrieval and semantic
+    recall; only the first of those reaches the embedding API.
+    """
+    key = text.strip()
+    vector = _query_embeddings.get(key)
+    if vector is None:
+        vector = await Config.get_embeddings().aembed_query(key)
+        _query_embeddings[key] = vector
+        if len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embeddings.popitem(last=False)
+    else:
+        _query_embeddings.move_to_end(key)
+    return vector
+
+async def embed_for_cache(text: str) -> Optional[List[float]]:
+    """Embed text for semantic cache lookups; None (cache bypassed) on failure."""
+    try:
+        return await embed_query(text)
+    except Exception as e:
+        print(f"Semantic cache embedding failed: {e}")
+        return None
+
+@functools.lru_cache(maxsize=1024)
+def _extract_keywords_cached(user_input: str) -> tuple:
     llm = Config.get_utility_llm()
     prompt = f"""
     Extract 3-5 distinct technical keywords or phrases from the user's description.
     Return ONLY the keywords separated by commas.
     User description: {user_input}
     """
+    response = llm.invoke(prompt)
+    return tuple(k.strip() for k in response.content.split(',') if k.strip())
+
+# --- Fast Keyword Path ---
+# List-style input ("Python, Django, 机器学习") is split deterministically; anything
+# that reads as prose goes to the LLM: more than _FAST_MAX_ITEMS items (a sentence,
+# not a term list), or a CJK item longer than a typical term (without a segmenter a
+# Chinese clause has no word boundaries).
+_FAST_MAX_ITEMS = 6
+_KEYWORD_SPLIT_RE = re.compile(r"[\s,，、;；/|]+")
+_ASCII_TERM_RE = re.compile(r"[A-Za-z][A-Za-z0-9+#.\-]*")
+_CJK_TERM_RE = re.compile(r"[\u4e00-\u9fff]{1,6}")
+_KEYWORD_STOPWORDS = frozenset({
+    "a", "an", "and", "or", "the", "i", "im", "me", "my", "am", "is", "are", "to", "of",
+    "in", "on", "for", "with", "want", "looking", "know", "like", "familiar", "interested",
+    "using", "use", "project", "projects",
+    "我", "的", "和", "与", "及", "以及", "想", "想找", "项目", "相关", "熟悉", "感兴趣", "喜欢", "会",
+})
+
+def extract_keywords_fast(user_input: str) -> Optional[List[str]]:
+    """Up to 5 keywords from list-style input without an LLM call, or None if the LLM is needed."""
+    items = [item.strip(".-") for item in _KEYWORD_SPLIT_RE.split(user_input.strip())]
+    items = [item for item in items if item]
+    if len(items) > _FAST_MAX_ITEMS:
+        return None
+    keywords = {}
+    for item in items:
+        if not (_ASCII_TERM_RE.fullmatch(item) or _CJK_TERM_RE.fullmatch(item)):
+            return None  # Prose or mixed-script run: needs real segmentation
+        if item.casefold() not in _KEYWORD_STOPWORDS:
+            keywords.setdefault(item.casefold(), item)
+    return list(keywords.values())[:5] if len(keywords) >= 3 else None
+
+@tool
+def extract_keywords(user_input: str) -> list[str]:
+    """Extract 3-5 distinct technical keywords from user description."""
+    fast = extract_keywords_fast(user_input)
+    if fast:
+        return fast
     try:
-        response = llm.invoke(prompt)
-        keywords = [k.strip() for k in response.content.split(',') if k.strip()]
-        return keywords
+        # Errors propagate out of the cached call, so the fallback below is never cached
+        return list(_extract_keywords_cached(user_input.strip()))
     except Exception as e:
         return [user_input]
 
+# Tag fields read from each hit (never "*", which would also return the vectors)
+INTEREST_TAG_FIELDS = ["id", "value", "tag_name", "type"]
+SKILL_TAG_FIELDS = ["id", "post", "tag_name", "type"]
+
+async def _batch_search_tags(store, vectors: List[List[float]], output_fields: List[str], k: int = 5) -> list:
+    """Top-k tag hits for each vector in a single Milvus search; entities carry output_fields."""
+    return await store.aclient.search(
+        collection_name=store.collection_name,
+        data=vectors,
+        anns_field="vector",
+        limit=k,
+        output_fields=output_fields,
+        search_params=store.search_params,  # Metric and ef of the live index (Config.get_milvus_store)
+    )
+
+def _top_k(results: dict, k: int) -> list:
+    """The k (meta, score) pairs with the highest scores, best first; only those k are fully sorted."""
+    items = list(results.values())
+    if len(items) > k:
+        scores = np.fromiter((score for _, score in items), dtype=np.float64, count=len(items))
+        items = [items[i] for i in np.argpartition(-scores, k)[:k]]
+    return sorted(items, key=lambda x: x[1], reverse=True)
+
 @tool
 async def retrieve_tags(queries: list[str]) -> dict:
     """Retrieve relevant interest and skill tags from Milvus based on queries."""
@@ -29,35 +134,39 @@ async def retrieve_tags(queries: list[str]) -> dict:
     
     interest_results = {}
     skill_results = {}
+    queries = list(dict.fromkeys(queries))  # Drop repeated queries, keep order
     
-    for q in queries:
+    if queries:
         try:
-            # Interest Search
-            docs_int = await interest_store.asimilarity_search_with_score(q, k=5)
-            for doc, score in docs_int:
-                doc_id = doc.metadata.get('id')
-                if doc_id not in interest_results:
-                    interest_results[doc_id] = (doc, score)
-            
-            # Skill Search
-            docs_skill = await skill_store.asimilarity_search_with_score(q, k=5)
-            for doc, score in docs_skill:
-                doc_id = doc.metadata.get('id')
-                if doc_id not in skill_results:
-                    skill_results[doc_id] = (doc, score)
+            # Embed every query once, then send all vectors in one search per collection
+            # (Milvus returns one hit list per vector) instead of a round trip per query.
+            vectors = await asyncio.gather(*(embed_query(q) for q in queries))
+            hits_int, hits_skill = await asyncio.gather(
+                _batch_search_tags(interest_store, vectors, INTEREST_TAG_FIELDS),
+                _batch_search_tags(skill_store, vectors, SKILL_TAG_FIELDS),
+            )
+            for store, results, hits in (
+                (interest_store, interest_results, hits_int),
+                (skill_store, skill_results, hits_skill),
+            ):
+                for query_hits in hits:
+                    for hit in query_hits:
+                        meta = hit["entity"]
+                        doc_id = meta.get('id')
+                        if doc_id not in results:
+                            results[doc_id] = (meta, Config.milvus_similarity(store, hit["distance"]))
         except Exception as e:
-            print(f"Error in retrieval for '{q}': {e}")
+            print(f"Error in retrieval for {queries}: {e}")
 
     # Format Output
     context_str = "Matched Interest Tags:\n"
     cand_int_ids = []
     interest_tags = []
 
-    # Sort by score descending
-    sorted_interest = sorted(interest_results.values(), key=lambda x: x[1], reverse=True)[:6]
+    # Top 6 by score, descending
+    sorted_interest = _top_k(interest_results, 6)
     
-    for doc, score in sorted_interest:
-        meta = doc.metadata
+    for meta, score in sorted_interest:
         tid = meta.get('id')
         cand_int_ids.append(tid)
         # Use 'value' field for interest tags (Tag1) which contains full "Domain-SubDomain" format
@@ -73,11 +182,10 @@ async def retrieve_tags(queries: list[str]) -> dict:
     cand_skill_ids = []
     skill_tags = []
 
-    # Sort by score descending
-    sorted_skill = sorted(skill_results.values(), key=lambda x: x[1], reverse=True)[:6]
+    # Top 6 by score, descending
+    sorted_skill = _top_k(skill_results, 6)
 
-    for doc, score in sorted_skill:
-        meta = doc.metadata
+    for meta, score in sorted_skill:
         tid = meta.get('id')
         cand_skill_ids.append(tid)
         # Use 'post' field for skill tags (Tag2) which contains full "Category-SubCategory-Skill" format
@@ -97,6 +205,23 @@ async def retrieve_tags(queries: list[str]) -> dict:
         "skill_tags": skill_tags
     }
 
+async def _public_project_ids(project_ids) -> set:
+    """The subset of project_ids whose status may be shown, checked in MySQL per call."""
+    project_ids = list(dict.fromkeys(pid for pid in project_ids if pid is not None))
+    if not project_ids:
+        return set()
+    pool = await AsyncMySQLPool.get_or_create_pool()
+    async with pool.acquire() as conn, conn.cursor() as cursor:
+        await cursor.execute(
+            f"""
+            SELECT id FROM project_requirement
+            WHERE id IN ({in_placeholders(len(project_ids))})
+            AND status IN ('in_progress', 'completed', 'paused')
+            """,
+            project_ids
+        )
+        return {row[0] for row in await cursor.fetchall()}
+
 @tool
 async def retrieve_project_details(query: str) -> str:
     """
@@ -106,37 +231,14 @@ async def retrieve_project_details(query: str) -> str:
     try:
         store = Config.get_milvus_store("project_raw_docs")
         # Search more candidates to allow for filtering
-        docs = await store.asimilarity_search_with_score(query, k=20)
+        docs = await store.asimilarity_search_with_score_by_vector(await embed_query(query), k=20)
         
         if not docs:
             return "No relevant project details found."
             
-        # Collect Project IDs
-        project_ids = set()
-        for doc, score in docs:
-            pid = doc.metadata.get('project_id')
-            if pid:
-                project_ids.add(pid)
-        
-        if not project_ids:
-            return "No relevant project details found."
-            
-        # Filter by Status via MySQL
-        conn = Config.get_db_connection()
-        valid_ids = set()
-        try:
-            cursor = conn.cursor()
-            format_strings = ','.join(['%s'] * len(project_ids))
-            sql = f"""
-            SELECT id FROM project_requirement 
-            WHERE id IN ({format_strings}) 
-            AND status IN ('in_progress', 'completed', 'paused')
-            """
-            cursor.execute(sql, tuple(project_ids))
-            for r in cursor.fetchall():
-                valid_ids.add(r[0])
-        finally:
-            conn.close()
+        # Filter by Status (status lives in MySQL, not in the Milvus collection).
+        # Only the returned ids are checked, so a status change is visible immediately.
+        valid_ids = await _public_project_ids(doc.metadata.get('project_id') for doc, _ in docs)
             
         # Filter docs
         results = []